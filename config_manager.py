@@ -13,6 +13,13 @@ class ConfigManager:
             default_config = {
                 "connectBaseUrl": "", # 可选，一键连接的基础URL，例如 https://steam-connect.laoyutang.cn
                 "mapNameUrl": "", # 可选，获取地图真名API，例如 https://l4d2-maps.laoyutang.cn
+                "pollInterval": 60, # 后台轮询间隔(秒)，用于服务器动态通知、找人、人数统计和状态接口，0 表示关闭
+                "pollWorkers": 0, # 可选，多进程分片轮询的进程数，服务器数量很多时使用，0 表示在主进程中轮询
+                "statusApi": { # 可选，只读 JSON 状态接口，数据来自后台轮询
+                    "enabled": False,
+                    "host": "127.0.0.1",
+                    "port": 8787
+                },
                 "group_configs": [
                     {
                         "group_id": 12345678,
@@ -43,6 +50,14 @@ class ConfigManager:
         with open(self.config_path, 'w', encoding='utf-8') as f:
             json.dump(config, f, indent=4, ensure_ascii=False)
 
+    def save(self):
+        """将当前配置写回文件"""
+        self._save_config(self.config)
+
+    def get_group_configs(self) -> List[Dict[str, Any]]:
+        """获取所有群的配置"""
+        return self.config.get("group_configs", [])
+
     def get_group_config(self, group_id: str) -> Optional[Dict[str, Any]]:
         """根据群号获取配置"""
         group_configs = self.config.get("group_configs", [])
@@ -58,3 +73,15 @@ class ConfigManager:
     def get_map_name_url(self) -> str:
         """获取地图真名API"""
         return self.config.get("mapNameUrl", "")
+
+    def get_poll_interval(self) -> float:
+        """获取后台轮询间隔(秒)，0 表示关闭；未配置时关闭，避免升级后对已有配置产生额外查询"""
+        return float(self.config.get("pollInterval", 0))
+
+    def get_status_api_config(self) -> Dict[str, Any]:
+        """获取 JSON 状态接口配置"""
+        return self.config.get("statusApi", {})
+
+    def get_poll_workers(self) -> int:
+        """获取分片轮询进程数，0 表示不使用多进程"""
+        return int(self.config.get("pollWorkers", 0))
@@ -1,10 +1,91 @@
 import a2s
 import socket
+import sys
 import urllib.request
 import time
 import threading
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, NamedTuple, Optional, Tuple
 from astrbot.api.all import logger
+from .profiler import profiler
+
+# 常见游戏模式和难度的中文名称
+GAME_MODE_NAMES = {
+    "coop": "战役",
+    "realism": "写实",
+    "versus": "对抗",
+    "teamversus": "团队对抗",
+    "survival": "生还者",
+    "scavenge": "清道夫",
+    "teamscavenge": "团队清道夫",
+}
+DIFFICULTY_NAMES = {
+    "easy": "简单",
+    "normal": "普通",
+    "hard": "高级",
+    "impossible": "专家",
+}
+
+def describe_mode(game_mode: str, difficulty: str) -> str:
+    """将 mp_gamemode 和 z_difficulty 转换为显示文本，例如 "战役 (专家)" """
+    if not game_mode:
+        return ""
+    mode = GAME_MODE_NAMES.get(game_mode.lower(), game_mode)
+    # 难度只对战役类模式有意义
+    if difficulty and game_mode.lower() in ("coop", "realism"):
+        mode += f" ({DIFFICULTY_NAMES.get(difficulty.lower(), difficulty)})"
+    return mode
+
+class ServerInfo(NamedTuple):
+    """服务器基本信息快照 (不可变，无实例字典)"""
+    server_name: str
+    map_name: str
+    player_count: int
+    max_players: int
+    ping: int
+    game_mode: str
+    difficulty: str
+    # A2S 返回的原始地图代码，map_name 可能是经过 mapNameUrl 转换的显示名称
+    map_code: str = ""
+
+class PlayerInfo(NamedTuple):
+    """玩家信息快照"""
+    name: str
+    score: int
+    duration: float
+
+def info_delta(old: ServerInfo, new: ServerInfo) -> Dict[str, Any]:
+    """同一服务器相邻两次快照之间变化的字段"""
+    return {field: value for field, old_value, value in zip(ServerInfo._fields, old, new) if old_value != value}
+
+class ServerStats:
+    """单个服务器的滚动查询统计，指令和后台轮询的线程会同时写入，读写都需加锁"""
+    # 延迟指数移动平均的平滑系数
+    ALPHA = 0.2
+
+    def __init__(self):
+        self.queries = 0
+        self.failures = 0
+        self.avg_ping = 0.0
+        self.last_online = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, ping: Optional[int]):
+        """记录一次查询结果，ping 为 None 表示查询失败"""
+        with self._lock:
+            self.queries += 1
+            if ping is None:
+                self.failures += 1
+                return
+            self.last_online = time.time()
+            if self.queries - self.failures == 1:
+                self.avg_ping = float(ping)
+            else:
+                self.avg_ping += self.ALPHA * (ping - self.avg_ping)
+
+    def snapshot(self) -> Tuple[int, int, float, float]:
+        """一致地读取 (查询次数, 失败次数, 平均延迟, 最后在线时间)"""
+        with self._lock:
+            return self.queries, self.failures, self.avg_ping, self.last_online
 
 class L4D2Server:
     # 类变量作为缓存，所有实例共享 map_code -> (real_name, timestamp)
@@ -15,11 +96,27 @@ class L4D2Server:
     _request_locks: Dict[str, threading.Lock] = {}
     _locks_lock = threading.Lock()
 
+    # 服务器规则在一局游戏中很少变化，使用较长的过期时间，换图时立即刷新
+    RULES_TTL = 1800
+    # 获取规则失败时只短暂缓存，避免服务器恢复后长时间缺少模式和难度
+    RULES_RETRY = 30
+
     def __init__(self, name: str, address: str, map_name_url: str = ""):
         self.name = name
         self.address = address
         self.map_name_url = map_name_url
         self.ip, self.port = self._parse_address(address)
+        # DNS 解析结果，由 ServerRegistry 异步刷新；未解析时直接使用配置中的主机名
+        self.resolved_ip: Optional[str] = None
+        self.resolved_at = 0.0
+        self.stats = ServerStats()
+        # 服务器规则缓存 (rules, map_code, expires_at)
+        self._rules: Optional[Tuple[Dict[str, str], str, float]] = None
+
+    @property
+    def endpoint(self) -> Tuple[str, int]:
+        """实际用于查询的地址 (优先使用已解析的 IP)"""
+        return (self.resolved_ip or self.ip, self.port)
 
     def _parse_address(self, address: str) -> Tuple[str, int]:
         if ":" in address:
@@ -66,7 +163,7 @@ class L4D2Server:
             logger.info(f"Querying map name URL: {url}")
 
             try:
-                with urllib.request.urlopen(url, timeout=2.0) as response:
+                with profiler.span("map_name"), urllib.request.urlopen(url, timeout=2.0) as response:
                     if response.status == 200:
                         content = response.read().decode('utf-8').strip()
                         if content: # 只有内容非空才缓存
@@ -81,39 +178,93 @@ class L4D2Server:
                 
         return map_code
 
-    def query_info(self) -> Optional[Dict[str, Any]]:
+    def _get_rules(self, map_code: str) -> Dict[str, str]:
+        """获取服务器规则，命中缓存且地图未变化时不发起请求"""
+        current_time = time.time()
+        if self._rules:
+            rules, cached_map, expires_at = self._rules
+            if cached_map == map_code and current_time < expires_at:
+                return rules
+
+        try:
+            with profiler.span("a2s_rules"):
+                rules = a2s.rules(self.endpoint, timeout=2.0)
+            ttl = self.RULES_TTL
+        except Exception as e:
+            logger.error(f"Error getting rules for {self.address}: {e}")
+            # 失败时也写入空缓存，避免每次查询都重试，但很快过期以便重新获取
+            rules = {}
+            ttl = self.RULES_RETRY
+
+        self._rules = (rules, map_code, current_time + ttl)
+        return rules
+
+    def query_info(self) -> Optional[ServerInfo]:
         """查询服务器基本信息"""
         try:
             # timeout 设置为 2 秒，避免阻塞太久
-            info = a2s.info((self.ip, self.port), timeout=2.0)
+            with profiler.span("a2s_info"):
+                info = a2s.info(self.endpoint, timeout=2.0)
             
             # 获取地图真实名称
             real_map_name = self._get_map_real_name(info.map_name)
 
-            return {
-                "server_name": info.server_name,
-                "map_name": real_map_name,
-                "player_count": info.player_count,
-                "max_players": info.max_players,
-                "ping": int(info.ping * 1000)
-            }
+            # 获取游戏模式和难度 (来自缓存的服务器规则)
+            rules = self._get_rules(info.map_name)
+
+            ping = int(info.ping * 1000)
+            self.stats.record(ping)
+            # 服务器名、地图名等在多次轮询间重复出现，使用驻留字符串共享同一对象
+            return ServerInfo(
+                sys.intern(info.server_name),
+                sys.intern(real_map_name),
+                info.player_count,
+                info.max_players,
+                ping,
+                sys.intern(rules.get("mp_gamemode", "")),
+                sys.intern(rules.get("z_difficulty", "")),
+                sys.intern(info.map_name)
+            )
         except Exception as e:
             # 捕获所有异常以防止崩溃，返回 None 表示离线或无法连接
+            self.stats.record(None)
+            return None
+
+    async def probe_info(self) -> Optional[ServerInfo]:
+        """
+        只发送一次 A2S_INFO 的轻量查询 (异步，不占用线程池)，用于端口扫描
+        不查询地图真名和服务器规则，map_name 为原始地图代码，模式和难度为空
+        """
+        try:
+            info = await a2s.ainfo(self.endpoint, timeout=2.0)
+        except Exception:
             return None
+        return ServerInfo(
+            info.server_name,
+            info.map_name,
+            info.player_count,
+            info.max_players,
+            int(info.ping * 1000),
+            "",
+            "",
+            info.map_name
+        )
 
-    def query_players(self) -> Optional[List[Dict[str, Any]]]:
+    def query_players(self) -> Optional[Tuple[PlayerInfo, ...]]:
         """查询玩家列表"""
         try:
-            players = a2s.players((self.ip, self.port), timeout=2.0)
+            with profiler.span("a2s_players"):
+                players = a2s.players(self.endpoint, timeout=2.0)
             # 过滤掉名字为空的玩家（有时是连接中的玩家或机器人）
-            return [{"name": p.name, "score": p.score, "duration": p.duration} for p in players if p.name]
+            return tuple(PlayerInfo(p.name, p.score, p.duration) for p in players if p.name)
         except Exception as e:
             return None
 
     def execute_rcon(self, password: str, command: str) -> str:
         """通过 RCON 执行指令"""
         from .rcon_client import RCONClient
-        client = RCONClient(self.ip, self.port, password)
+        ip, port = self.endpoint
+        client = RCONClient(ip, port, password)
         return client.execute(command)
 
     def restart(self, password: str) -> str:
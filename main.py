@@ -1,19 +1,158 @@
 from astrbot.api.all import *
-from astrbot.api.event import filter
+from astrbot.api.event import filter, MessageChain
 import os
+import time
 import asyncio
 import re
 from .l4d2_query import L4D2Server
 from .config_manager import ConfigManager
 from .workshop_utils import WorkshopTools
+from .rolling_restart import RollingRestarter
+from .server_watcher import ServerWatcher
+from .server_registry import ServerRegistry
+from .player_index import PlayerIndex
+from .player_stats import PlayerStats
+from .status_api import StatusAPI
+from .snapshot_store import SnapshotStore
+from .sharded_poller import ShardedPoller
+from .profiler import profiler
+from . import render
 
 @register("l4d2_query", "YourName", "L4D2服务器查询插件", "1.0.0")
 class L4D2Plugin(Star):
+    # connect 端口段扫描的端口数上限，所有端口同时探测，在一个超时窗口内完成
+    MAX_SCAN_PORTS = 64
+    # 每轮询多少次保存一次人数历史快照
+    STATS_SAVE_EVERY = 10
+    # 单次性能分析的最长时间 (秒)
+    MAX_PROFILE_SECONDS = 300
+
     def __init__(self, context: Context):
         super().__init__(context)
         self.config_path = os.path.join(os.path.dirname(__file__), "config.json")
         self.cfg = ConfigManager(self.config_path)
         self.workshop = WorkshopTools()
+        self.watcher = ServerWatcher()
+        self.player_index = PlayerIndex()
+        self.stats = PlayerStats(os.path.join(os.path.dirname(__file__), "player_stats.bin"))
+        self.stats.load()
+        self._poll_count = 0
+        # 是否已有性能分析指令在执行 (在第一次回复前占用，避免并发指令重复开启)
+        self._profiling = False
+        # 正在执行滚动重启的群号，避免同一组服务器被重叠重启
+        self._restarting = set()
+        # 各服务器最新的轮询快照，供状态接口等使用
+        self.snapshots = SnapshotStore()
+        # 所有指令共享的服务器注册表，配置加载时为每个地址构建一次
+        self.registry = ServerRegistry()
+        self.registry.load(self.cfg.get_group_configs(), self.cfg.get_map_name_url())
+
+        # 可选的多进程分片轮询，适用于服务器数量很多的情况
+        self.sharded = None
+        workers = self.cfg.get_poll_workers()
+        if workers > 0:
+            self.sharded = ShardedPoller(workers, self.cfg.get_map_name_url())
+            self.sharded.start()
+            self.sharded.assign(list(self.registry.servers()))
+        self._poll_task = asyncio.create_task(self._poll_loop())
+
+        # 可选的只读 JSON 状态接口
+        self.status_api = StatusAPI(self.cfg, self.snapshots)
+        self._status_task = None
+        api_conf = self.cfg.get_status_api_config()
+        if api_conf.get("enabled"):
+            self._status_task = asyncio.create_task(
+                self._start_status_api(api_conf.get("host", "127.0.0.1"), int(api_conf.get("port", 8787))))
+
+    async def terminate(self):
+        """插件卸载时停止后台轮询和状态接口，并保存人数历史"""
+        self._poll_task.cancel()
+        if self._status_task:
+            self._status_task.cancel()
+        if self.sharded:
+            await asyncio.get_running_loop().run_in_executor(None, self.sharded.stop)
+        # 取消轮询不会中断线程池中正在进行的保存，save 内部加锁，等待其完成后再做最终保存
+        await asyncio.get_running_loop().run_in_executor(None, self.stats.save)
+        await self.status_api.stop()
+
+    async def _start_status_api(self, host: str, port: int):
+        """启动状态接口，端口被占用等错误只记录日志，不影响插件其他功能"""
+        try:
+            await self.status_api.start(host, port)
+        except Exception as e:
+            logger.error(f"[L4D2Plugin] Failed to start status API on {host}:{port}: {e}")
+            await self.status_api.stop()
+
+    async def _poll_loop(self):
+        """后台定时轮询所有服务器"""
+        while True:
+            interval = self.cfg.get_poll_interval()
+            if interval <= 0:
+                return
+            try:
+                await self._poll_once()
+            except Exception as e:
+                logger.error(f"[L4D2Plugin] Poll error: {e}")
+            await asyncio.sleep(interval)
+
+    async def _poll_once(self):
+        """轮询一次所有已注册的服务器，更新玩家索引并推送状态变化通知"""
+        loop = asyncio.get_running_loop()
+        if self.sharded:
+            results = await self.sharded.poll(self.cfg.get_poll_interval())
+        else:
+            # 轮询直接遍历注册表，不经过 registry.get，需要在这里刷新过期的 DNS 解析
+            self.registry.refresh_due()
+            servers = self.registry.servers()
+            tasks = [loop.run_in_executor(None, self._poll_server, server) for server in servers.values()]
+            results = dict(zip(servers, await asyncio.gather(*tasks)))
+
+        now = time.time()
+        for address, (info, players) in results.items():
+            self.stats.record(address, info, now)
+            if players:
+                self.player_index.update(address, [p.name for p in players])
+            else:
+                self.player_index.drop(address)
+
+        self.snapshots.update(results)
+        self.snapshots.retain(results)
+
+        self._poll_count += 1
+        if self._poll_count % self.STATS_SAVE_EVERY == 0:
+            await loop.run_in_executor(None, self.stats.save)
+
+        await self._notify_changes({address: info for address, (info, _) in results.items()})
+
+    def _poll_server(self, server: L4D2Server):
+        """辅助函数：同步查询单个服务器信息，有玩家时同时查询玩家列表"""
+        info = server.query_info()
+        players = None
+        if info and info.player_count > 0:
+            players = server.query_players()
+        return info, players
+
+    async def _notify_changes(self, infos):
+        """比较服务器状态变化，并推送给订阅的群"""
+        events = {address: self.watcher.observe(address, info) for address, info in infos.items()}
+        self.watcher.forget(infos)
+
+        subscribed = [g for g in self.cfg.get_group_configs() if g.get("notify", {}).get("umo")]
+        for group_conf in subscribed:
+            notify = group_conf["notify"]
+            wanted = set(notify.get("events") or ServerWatcher.EVENTS)
+            lines = [
+                f"[{conf['name']}] {desc}"
+                for conf in group_conf.get("servers", [])
+                for event_type, desc in events.get(conf["address"], [])
+                if event_type in wanted
+            ]
+            group_id = str(group_conf.get("group_id"))
+            if lines:
+                self.watcher.queue(group_id, lines)
+            msg = self.watcher.take(group_id, float(notify.get("min_interval", 60)))
+            if msg:
+                await self.context.send_message(notify["umo"], MessageChain().message(msg))
 
     def _get_group_config(self, event: AstrMessageEvent):
         """获取当前群的配置"""
@@ -29,7 +168,8 @@ class L4D2Plugin(Star):
     @filter.regex(r"^查询\s*(.+)$")
     async def query_server(self, event: AstrMessageEvent, *args, **kwargs):
         """查询指定L4D2服务器状态。用法：查询 [服务器名]"""
-        group_conf = self._get_group_config(event)
+        with profiler.span("config_lookup"):
+            group_conf = self._get_group_config(event)
         if not group_conf:
             # 如果不在配置的群组中，不响应
             return
@@ -44,19 +184,19 @@ class L4D2Plugin(Star):
             yield event.plain_result("请输入服务器名称，例如：查询 主服务器")
             return
 
-        servers = group_conf.get("servers", [])
-        server_config = None
-        for s in servers:
-            if s.get("name", "").replace(" ", "") == target_name:
-                server_config = s
-                break
+        with profiler.span("name_match"):
+            servers = group_conf.get("servers", [])
+            server_config = None
+            for s in servers:
+                if s.get("name", "").replace(" ", "") == target_name:
+                    server_config = s
+                    break
         
         if not server_config:
             # 未找到服务器，静默返回
             return
 
-        map_name_url = self.cfg.get_map_name_url()
-        server = L4D2Server(server_config["name"], server_config["address"], map_name_url)
+        server = self.registry.get(server_config["address"])
         
         yield event.plain_result(f"正在查询 {server_config['name']}，请稍候...")
         
@@ -64,41 +204,18 @@ class L4D2Plugin(Star):
         info = await loop.run_in_executor(None, server.query_info)
         
         if not info:
-            yield event.plain_result(f"无法连接到服务器 {server_config['name']}，可能服务器离线或网络问题。")
+            msg = f"无法连接到服务器 {server_config['name']}，可能服务器离线或网络问题。"
+            last_online = render.format_last_online(server.stats)
+            if last_online:
+                msg += f"\n{last_online}"
+            yield event.plain_result(msg)
             return
 
         players = await loop.run_in_executor(None, server.query_players)
         
-        msg = f"服务器: {info['server_name']}\n"
-        msg += f"地图: {info['map_name']}\n"
-        msg += f"人数: {info['player_count']}/{info['max_players']}\n"
-        msg += f"延迟: {info['ping']}ms\n"
-        
-        if players:
-            msg += "\n在线玩家:\n"
-            for p in players:
-                duration = int(p['duration'])
-                m, s = divmod(duration, 60)
-                h, m = divmod(m, 60)
-                d, h = divmod(h, 24)
-                if d > 0:
-                    time_str = f"{d}:{h:02d}:{m:02d}:{s:02d}"
-                elif h > 0:
-                    time_str = f"{h}:{m:02d}:{s:02d}"
-                else:
-                    time_str = f"{m}:{s:02d}"
-                msg += f"- {p['name']} ({time_str})\n"
-        else:
-            msg += "\n当前无玩家在线。"
-
-        base_url = self.cfg.get_connect_base_url()
-        if base_url:
-            if base_url.endswith("/"):
-                msg += f"\n点击直连: {base_url}{server.ip}:{server.port}"
-            else:
-                msg += f"\n点击直连: {base_url}/{server.ip}:{server.port}"
-        else:
-            msg += f"\n连接指令: connect {server.ip}:{server.port}"
+        with profiler.span("render"):
+            connect = render.connect_line(self.cfg.get_connect_base_url(), server.ip, server.port)
+            msg = render.format_server_status(info, players, connect, stats=server.stats)
         yield event.plain_result(msg)
 
     @filter.regex(r"^connect\s+([a-zA-Z0-9\.:]+)$")
@@ -106,10 +223,8 @@ class L4D2Plugin(Star):
         """查询 connect 指令中的服务器信息"""
         address = event.message_str.replace("connect", "", 1).strip()
         
-        # 创建临时服务器对象进行查询
-        # 名称暂时用 "Unknown Server" 代替，查询成功后会更新
-        map_name_url = self.cfg.get_map_name_url()
-        temp_server = L4D2Server("Unknown Server", address, map_name_url)
+        # 已配置的地址使用注册表中的实例，否则创建临时服务器对象进行查询
+        temp_server = self.registry.get(address)
         
         yield event.plain_result(f"正在查询 {address}，请稍候...")
         
@@ -122,44 +237,52 @@ class L4D2Plugin(Star):
 
         players = await loop.run_in_executor(None, temp_server.query_players)
         
-        msg = f"服务器: {info['server_name']}\n"
-        msg += f"地址: {address}\n"
-        msg += f"地图: {info['map_name']}\n"
-        msg += f"人数: {info['player_count']}/{info['max_players']}\n"
-        msg += f"延迟: {info['ping']}ms\n"
-        
-        if players:
-            msg += "\n在线玩家:\n"
-            for p in players:
-                duration = int(p['duration'])
-                m, s = divmod(duration, 60)
-                h, m = divmod(m, 60)
-                d, h = divmod(h, 24)
-                if d > 0:
-                    time_str = f"{d}:{h:02d}:{m:02d}:{s:02d}"
-                elif h > 0:
-                    time_str = f"{h}:{m:02d}:{s:02d}"
-                else:
-                    time_str = f"{m}:{s:02d}"
-                msg += f"- {p['name']} ({time_str})\n"
-        else:
-            msg += "\n当前无玩家在线。"
+        with profiler.span("render"):
+            connect = render.connect_line(self.cfg.get_connect_base_url(), temp_server.ip, temp_server.port)
+            msg = render.format_server_status(info, players, connect, address)
+        yield event.plain_result(msg)
 
-        base_url = self.cfg.get_connect_base_url()
-        if base_url:
-            if base_url.endswith("/"):
-                msg += f"\n点击直连: {base_url}{temp_server.ip}:{temp_server.port}"
-            else:
-                msg += f"\n点击直连: {base_url}/{temp_server.ip}:{temp_server.port}"
-        else:
-            msg += f"\n连接指令: connect {temp_server.ip}:{temp_server.port}"
+    @filter.regex(r"^connect\s+([a-zA-Z0-9\.]+):(\d+)-(\d+)$")
+    async def scan_port_range(self, event: AstrMessageEvent, *args, **kwargs):
+        """并发扫描同一主机上一段端口内的所有服务器。用法：connect IP:起始端口-结束端口"""
+        match = re.match(r"^connect\s+([a-zA-Z0-9\.]+):(\d+)-(\d+)$", event.message_str.strip())
+        if not match:
+            return
 
-        yield event.plain_result(msg)
+        host = match.group(1)
+        start_port, end_port = int(match.group(2)), int(match.group(3))
+        if start_port > end_port:
+            start_port, end_port = end_port, start_port
+
+        if end_port > 65535 or end_port - start_port + 1 > self.MAX_SCAN_PORTS:
+            yield event.plain_result(f"端口范围无效，单次最多扫描 {self.MAX_SCAN_PORTS} 个端口。")
+            return
+
+        yield event.plain_result(f"正在扫描 {host}:{start_port}-{end_port}，请稍候...")
+
+        # 使用异步的 A2S_INFO 探测，不占用线程池，也不查询地图真名和规则
+        ports = range(start_port, end_port + 1)
+        infos = await asyncio.gather(*[self.registry.get(f"{host}:{port}").probe_info() for port in ports])
+        results = list(zip(ports, infos))
+        online = [(port, info) for port, info in results if info]
+
+        if not online:
+            yield event.plain_result(f"{host}:{start_port}-{end_port} 范围内没有响应的服务器。")
+            return
+
+        lines = [f"=== {host} 扫描结果 ===", f"在线: {len(online)}/{len(results)}", "-" * 25]
+        for port, info in online:
+            map_name = render.truncate_text(render.short_map_name(info.map_name), 15)
+            lines.append(f"[{port}] {render.truncate_text(info.server_name, 20)}")
+            lines.append(f"{info.player_count}/{info.max_players}   {map_name}   {info.ping}ms")
+
+        yield event.plain_result("\n".join(lines) + "\n")
 
     @filter.regex(r"^综合查询$")
     async def query_all(self, event: AstrMessageEvent, *args, **kwargs):
         """查询所有配置的L4D2服务器简略状态"""
-        group_conf = self._get_group_config(event)
+        with profiler.span("config_lookup"):
+            group_conf = self._get_group_config(event)
         if not group_conf:
             return
 
@@ -172,77 +295,98 @@ class L4D2Plugin(Star):
 
         loop = asyncio.get_running_loop()
         tasks = []
-        map_name_url = self.cfg.get_map_name_url()
         
         for conf in servers_config:
-            server = L4D2Server(conf["name"], conf["address"], map_name_url)
-            tasks.append(loop.run_in_executor(None, self._query_server_brief, server))
+            server = self.registry.get(conf["address"])
+            tasks.append(loop.run_in_executor(None, server.query_info))
 
-        results = await asyncio.gather(*tasks)
-        
-        total_servers = len(servers_config)
-        online_servers = 0
-        total_players = 0
-        total_slots = 0
-        
-        # 预处理数据，计算对齐所需的宽度
-        processed_servers = []
-        max_player_len = 0
-        
-        for res in results:
-            if res["online"]:
-                # 截断地图名，最大显示宽度15
-                trunc_map = self._truncate_text(res["map_name"], 15)
-                
-                # 记录人数显示字符串及其长度
-                p_str = f"{res['player_count']}/{res['max_players']}"
-                if len(p_str) > max_player_len:
-                    max_player_len = len(p_str)
-                
-                res["_map_display"] = trunc_map
-                res["_player_str"] = p_str
-            processed_servers.append(res)
-        
-        server_lines = []
-        for res in processed_servers:
-            if res["online"]:
-                online_servers += 1
-                total_players += res["player_count"]
-                total_slots += res["max_players"]
-                
-                s_name = res["server_name"]
-                s_name = self._truncate_text(s_name, 20)
-                
-                # 计算前缀宽度，用于第二行缩进
-                prefix = f"[{res['alias']}]"
-                prefix_width = self._get_text_width(prefix)
-                # 增加一个空格的缩进，以匹配第一行的空格
-                padding = self._make_padding(prefix_width) + " "
-                
-                # 人数对齐处理 (左对齐)
-                p_str = res["_player_str"]
-                # 针对非等宽字体优化：少一个字符补两个空格
-                diff = max_player_len - len(p_str)
-                p_padding = " " * (diff * 2)
-                
-                # 地图名
-                map_name = res["_map_display"]
-                
-                # 别名和服务器名之间增加空格，人数放前面(左对齐)，地图放后面
-                line = f"{prefix} {s_name}\n{padding}{p_str}{p_padding}   {map_name}"
-                server_lines.append(line)
-            else:
-                server_lines.append(f"[{res['alias']}] 离线或无法连接")
-            
-        msg = "=== L4D2 服务器概览 ===\n"
-        msg += f"服务器: {online_servers}/{total_servers} 在线\n"
-        msg += f"人数: {total_players}/{total_slots}\n"
-        msg += "-" * 25 + "\n"
-        for line in server_lines:
-            msg += line + "\n"
-        
+        infos = await asyncio.gather(*tasks)
+        results = [(conf["name"], info) for conf, info in zip(servers_config, infos)]
+        with profiler.span("render"):
+            msg = render.render_overview(results)
         yield event.plain_result(msg)
 
+    @filter.regex(r"^找人\s*(.+)$")
+    async def find_player(self, event: AstrMessageEvent, *args, **kwargs):
+        """在本群所有服务器中查找玩家。用法：找人 [玩家名]"""
+        group_conf = self._get_group_config(event)
+        if not group_conf:
+            return
+
+        query = event.message_str.replace("找人", "", 1).strip()
+        if not query:
+            yield event.plain_result("请输入玩家名，例如：找人 LaoYutang")
+            return
+
+        interval = self.cfg.get_poll_interval()
+        if interval <= 0:
+            yield event.plain_result("后台轮询未开启 (pollInterval 为 0)，无法找人。")
+            return
+
+        # 只显示本群配置的服务器，同一地址使用本群的服务器名称
+        aliases = {conf["address"]: conf["name"] for conf in group_conf.get("servers", [])}
+        matches = []
+        for name, addresses in self.player_index.search(query, set(aliases)):
+            names = [aliases[a] for a in addresses]
+            matches.append(f"- {name}: {'、'.join(names)}")
+
+        if not matches:
+            yield event.plain_result(f"未在本群服务器中找到玩家 {query}。")
+            return
+
+        msg = f"=== 找人: {query} ===\n"
+        msg += "\n".join(matches)
+        msg += f"\n(数据每 {int(interval)} 秒更新)"
+        yield event.plain_result(msg)
+
+    @filter.regex(r"^人数统计\s*(.*)$")
+    async def player_stats(self, event: AstrMessageEvent, *args, **kwargs):
+        """查看服务器人数历史统计。用法：人数统计 [服务器名]"""
+        group_conf = self._get_group_config(event)
+        if not group_conf:
+            return
+
+        servers = group_conf.get("servers", [])
+        target_name = event.message_str.replace("人数统计", "", 1).replace(" ", "")
+
+        if target_name:
+            server_config = None
+            for s in servers:
+                if s.get("name", "").replace(" ", "") == target_name:
+                    server_config = s
+                    break
+            if not server_config:
+                return
+
+            address = server_config["address"]
+            msg = f"=== {server_config['name']} 人数统计 ===\n"
+            for label, days in (("近24小时", 1), ("近7天", 7)):
+                summary = self.stats.summary(address, days)
+                if not summary:
+                    msg += f"{label}: 暂无数据\n"
+                    continue
+                peak, avg, uptime = summary
+                msg += f"{label}: 峰值 {peak}，平均 {avg:.1f}，在线率 {uptime:.0%}\n"
+            hour = self.stats.peak_hour(address)
+            if hour is not None:
+                msg += f"高峰时段: {hour:02d}:00-{(hour + 1) % 24:02d}:00\n"
+            yield event.plain_result(msg.strip())
+            return
+
+        if not servers:
+            yield event.plain_result("本群未配置任何服务器。")
+            return
+
+        msg = "=== 近24小时人数统计 ===\n"
+        for conf in servers:
+            summary = self.stats.summary(conf["address"], 1)
+            if not summary:
+                msg += f"[{conf['name']}] 暂无数据\n"
+                continue
+            peak, avg, uptime = summary
+            msg += f"[{conf['name']}] 峰值 {peak} 平均 {avg:.1f} 在线率 {uptime:.0%}\n"
+        yield event.plain_result(msg.strip())
+
     @filter.regex(r"^(服务器列表|服务器地址|连接指令)$")
     async def list_servers(self, event: AstrMessageEvent, *args, **kwargs):
         """列出所有服务器的连接地址"""
@@ -270,63 +414,6 @@ class L4D2Plugin(Star):
         
         yield event.plain_result(msg)
 
-    def _get_text_width(self, text: str) -> int:
-        """计算字符串显示宽度 (中文字符计为2，包含中文标点)"""
-        width = 0
-        for char in text:
-            # 判断 汉字(\u4e00-\u9fff) 或 全角字符(\uff00-\uffef, 包含中文小括号)
-            if '\u4e00' <= char <= '\u9fff' or '\uff00' <= char <= '\uffef':
-                width += 2
-            else:
-                width += 1
-        return width
-
-    def _truncate_text(self, text: str, max_width: int) -> str:
-        """根据显示宽度截断字符串"""
-        if self._get_text_width(text) <= max_width:
-            return text
-        
-        current_width = 0
-        result = ""
-        
-        for char in text:
-            # 保持一致的宽度计算逻辑
-            char_width = 2 if ('\u4e00' <= char <= '\u9fff' or '\uff00' <= char <= '\uffef') else 1
-            if current_width + char_width > max_width:
-                return result + "..."
-            current_width += char_width
-            result += char
-            
-        return result
-
-    def _make_padding(self, width: int) -> str:
-        """生成填充字符串，优先使用全角空格"""
-        full_spaces = width // 2
-        half_spaces = width % 2
-        return "\u3000" * full_spaces + " " * half_spaces
-
-    def _query_server_brief(self, server: L4D2Server):
-        """辅助函数：同步查询单个服务器简略信息"""
-        info = server.query_info()
-        if info:
-            map_name = info['map_name']
-            if "|" in map_name:
-                map_name = map_name.split("|")[0].strip()
-            
-            return {
-                "online": True,
-                "alias": server.name,
-                "server_name": info['server_name'],
-                "map_name": map_name,
-                "player_count": info['player_count'],
-                "max_players": info['max_players']
-            }
-        else:
-            return {
-                "online": False,
-                "alias": server.name
-            }
-
     def _check_permission(self, event: AstrMessageEvent, admin_list: list) -> bool:
         """检查发送者是否在管理员列表中"""
         try:
@@ -422,7 +509,7 @@ class L4D2Plugin(Star):
             yield event.plain_result(f"服务器 {matched_server['name']} 未配置 RCON 密码，无法执行指令。")
             return
 
-        server = L4D2Server(matched_server["name"], matched_server["address"])
+        server = self.registry.get(matched_server["address"])
         
         yield event.plain_result(f"正在向 {matched_server['name']} 发送指令: {command} ...")
         
@@ -482,7 +569,7 @@ class L4D2Plugin(Star):
             yield event.plain_result(f"服务器 {server_config['name']} 未配置 RCON 密码，无法执行重启。")
             return
 
-        server = L4D2Server(server_config["name"], server_config["address"])
+        server = self.registry.get(server_config["address"])
         
         yield event.plain_result(f"正在尝试重启 {server_config['name']}...")
         
@@ -498,6 +585,146 @@ class L4D2Plugin(Star):
         
         yield event.plain_result(result)
 
+    @filter.regex(r"^滚动重启\s*(\d*)$")
+    async def rolling_restart(self, event: AstrMessageEvent, *args, **kwargs):
+        """分批滚动重启本群所有服务器。用法：滚动重启 [每批数量]"""
+        group_conf = self._get_group_config(event)
+        if not group_conf:
+            return
+
+        # 检查权限
+        admin_users = group_conf.get("admin_users", [])
+        if not self._check_permission(event, admin_users):
+            yield event.plain_result("权限不足：您不在管理员列表中。")
+            return
+
+        arg = event.message_str.replace("滚动重启", "", 1).strip()
+        wave_size = int(arg) if arg else 1
+
+        targets = []
+        others = []
+        no_password = []
+        for conf in group_conf.get("servers", []):
+            server = self.registry.get(conf["address"])
+            rcon_password = conf.get("rcon_password")
+            if not rcon_password:
+                no_password.append(conf["name"])
+                others.append(server)
+                continue
+            targets.append((conf["name"], server, rcon_password))
+
+        if not targets:
+            yield event.plain_result("本群没有配置 RCON 密码的服务器，无法执行滚动重启。")
+            return
+
+        group_id = str(group_conf.get("group_id"))
+        if group_id in self._restarting:
+            yield event.plain_result("本群的滚动重启正在进行中，请等待完成后再试。")
+            return
+        self._restarting.add(group_id)
+
+        try:
+            msg = f"开始滚动重启 {len(targets)} 台服务器，每批最多 {wave_size} 台，有玩家的服务器将被推迟。"
+            if no_password:
+                msg += "\n未配置 RCON 密码，已跳过: " + "、".join(no_password)
+            yield event.plain_result(msg)
+
+            restarter = RollingRestarter(wave_size=wave_size)
+            async for progress in restarter.run(targets, others):
+                yield event.plain_result(progress)
+        finally:
+            self._restarting.discard(group_id)
+
+    @filter.regex(r"^订阅通知\s*(.*)$")
+    async def subscribe_notify(self, event: AstrMessageEvent, *args, **kwargs):
+        """订阅本群服务器的状态变化通知。用法：订阅通知 [换图 满人 空服 离线 上线]"""
+        group_conf = self._get_group_config(event)
+        if not group_conf:
+            return
+
+        # 检查权限
+        admin_users = group_conf.get("admin_users", [])
+        if not self._check_permission(event, admin_users):
+            yield event.plain_result("权限不足：您不在管理员列表中。")
+            return
+
+        names = {v: k for k, v in ServerWatcher.EVENTS.items()}
+        events = []
+        for word in event.message_str.replace("订阅通知", "", 1).split():
+            event_type = names.get(word, word)
+            if event_type not in ServerWatcher.EVENTS:
+                yield event.plain_result(f"未知的事件类型: {word}，可选: {' '.join(names)}")
+                return
+            events.append(event_type)
+
+        notify = group_conf.setdefault("notify", {})
+        notify["umo"] = event.unified_msg_origin
+        notify["events"] = events or list(ServerWatcher.EVENTS)
+        notify.setdefault("min_interval", 60)
+        self.cfg.save()
+
+        if self.cfg.get_poll_interval() <= 0:
+            yield event.plain_result("已保存订阅，但后台轮询未开启 (pollInterval 为 0)，不会推送通知。")
+            return
+        if self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+        desc = " ".join(ServerWatcher.EVENTS[e] for e in notify["events"])
+        yield event.plain_result(f"已订阅服务器动态通知: {desc}")
+
+    @filter.regex(r"^取消订阅通知$")
+    async def unsubscribe_notify(self, event: AstrMessageEvent, *args, **kwargs):
+        """取消本群的服务器状态变化通知"""
+        group_conf = self._get_group_config(event)
+        if not group_conf:
+            return
+
+        # 检查权限
+        admin_users = group_conf.get("admin_users", [])
+        if not self._check_permission(event, admin_users):
+            yield event.plain_result("权限不足：您不在管理员列表中。")
+            return
+
+        if group_conf.pop("notify", None) is None:
+            yield event.plain_result("本群未订阅服务器动态通知。")
+            return
+        self.cfg.save()
+        yield event.plain_result("已取消服务器动态通知。")
+
+    @filter.regex(r"^性能分析\s*(\d*)$")
+    async def profile_plugin(self, event: AstrMessageEvent, *args, **kwargs):
+        """开启限时性能分析，结束后发送热点摘要。用法：性能分析 [秒数]"""
+        group_conf = self._get_group_config(event)
+        if not group_conf:
+            return
+
+        # 检查权限
+        admin_users = group_conf.get("admin_users", [])
+        if not self._check_permission(event, admin_users):
+            yield event.plain_result("权限不足：您不在管理员列表中。")
+            return
+
+        if self._profiling or profiler.active:
+            yield event.plain_result("性能分析正在进行中，请稍后再试。")
+            return
+        self._profiling = True
+
+        try:
+            arg = event.message_str.replace("性能分析", "", 1).strip()
+            seconds = min(int(arg) if arg else 30, self.MAX_PROFILE_SECONDS)
+            yield event.plain_result(f"已开启性能分析，{seconds} 秒后发送结果...")
+
+            out_dir = os.path.join(os.path.dirname(__file__), "profiles")
+            try:
+                summary, path = await profiler.capture(seconds, out_dir)
+            except RuntimeError:
+                yield event.plain_result("性能分析正在进行中，请稍后再试。")
+                return
+            # 只显示文件名，不在群聊中暴露插件的安装路径
+            yield event.plain_result(f"{summary}\n\n完整结果: profiles/{os.path.basename(path)}")
+        finally:
+            self._profiling = False
+
     @filter.regex(r"https?://steamcommunity\.com/(?:sharedfiles|workshop)/filedetails/\?id=(\d+)")
     async def parse_workshop_link(self, event: AstrMessageEvent, *args, **kwargs):
         """解析创意工坊链接"""
@@ -0,0 +1,140 @@
+import difflib
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+def normalize_name(name: str) -> str:
+    """归一化玩家名：全角转半角、忽略大小写"""
+    return unicodedata.normalize("NFKC", name).casefold()
+
+
+class PlayerIndex:
+    """
+    基于轮询结果的玩家名倒排索引，用于跨服务器找人
+    词元 (token) -> 玩家名集合，玩家名 -> 所在服务器地址集合
+    """
+
+    # 拆分玩家名中的词元，忽略常见的分隔符号
+    TOKEN_SPLIT = re.compile(r"[\s\-_|\[\]()<>{}.,:;'\"!?*#@~/\\]+")
+    # 词元长度达到该值时建立子串索引 (二元组)
+    GRAM = 2
+
+    def __init__(self):
+        # address -> 该服务器当前玩家名集合
+        self._server_players: Dict[str, Set[str]] = {}
+        # 玩家名 -> 所在服务器地址集合
+        self._player_servers: Dict[str, Set[str]] = {}
+        # 词元 -> 玩家名集合
+        self._tokens: Dict[str, Set[str]] = {}
+        # 二元组 -> 词元集合，用于子串匹配
+        self._grams: Dict[str, Set[str]] = {}
+
+    def _tokenize(self, name: str) -> Set[str]:
+        normalized = normalize_name(name)
+        tokens = {t for t in self.TOKEN_SPLIT.split(normalized) if t}
+        # 同时索引完整名字，便于匹配跨分隔符的查询
+        tokens.add(normalized)
+        return tokens
+
+    def update(self, address: str, names: Iterable[str]) -> None:
+        """用服务器最新的玩家列表增量更新索引，只处理进出的玩家"""
+        new = set(names)
+        old = self._server_players.get(address, set())
+        for name in old - new:
+            self._remove(address, name)
+        for name in new - old:
+            self._add(address, name)
+        if new:
+            self._server_players[address] = new
+        else:
+            self._server_players.pop(address, None)
+
+    def drop(self, address: str) -> None:
+        """服务器离线时移除其所有玩家"""
+        self.update(address, ())
+
+    def _add(self, address: str, name: str) -> None:
+        servers = self._player_servers.setdefault(name, set())
+        servers.add(address)
+        if len(servers) > 1:
+            return
+        for token in self._tokenize(name):
+            players = self._tokens.setdefault(token, set())
+            if not players:
+                for i in range(len(token) - self.GRAM + 1):
+                    self._grams.setdefault(token[i:i + self.GRAM], set()).add(token)
+            players.add(name)
+
+    def _remove(self, address: str, name: str) -> None:
+        servers = self._player_servers.get(name)
+        if not servers:
+            return
+        servers.discard(address)
+        if servers:
+            return
+        del self._player_servers[name]
+        for token in self._tokenize(name):
+            players = self._tokens.get(token)
+            if players is None:
+                continue
+            players.discard(name)
+            if players:
+                continue
+            del self._tokens[token]
+            for i in range(len(token) - self.GRAM + 1):
+                gram = token[i:i + self.GRAM]
+                tokens = self._grams.get(gram)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._grams[gram]
+
+    def _match_tokens(self, query: str) -> Set[str]:
+        """查找包含 query 的所有词元"""
+        if query in self._tokens:
+            matched = {query}
+        else:
+            matched = set()
+        if len(query) < self.GRAM:
+            # 单字查询直接扫描词元
+            return matched | {t for t in self._tokens if query in t}
+        # 取所有二元组候选集合的交集，再校验子串
+        candidates = None
+        for i in range(len(query) - self.GRAM + 1):
+            tokens = self._grams.get(query[i:i + self.GRAM])
+            if not tokens:
+                return matched
+            candidates = set(tokens) if candidates is None else candidates & tokens
+            if not candidates:
+                return matched
+        return matched | {t for t in candidates if query in t}
+
+    def search(self, query: str, addresses: Optional[Set[str]] = None,
+               limit: int = 20) -> List[Tuple[str, Set[str]]]:
+        """
+        搜索玩家，返回 [(玩家名, 所在服务器地址集合)]，子串无结果时使用模糊匹配
+        指定 addresses 时只返回在这些服务器中的玩家，服务器集合也只保留这些地址，过滤在截断之前进行
+        """
+        query = normalize_name(query).strip()
+        if not query:
+            return []
+
+        players: Set[str] = set()
+        for token in self._match_tokens(query):
+            players |= self._tokens[token]
+
+        if addresses is not None:
+            players = {name for name in players if self._player_servers[name] & addresses}
+
+        if not players:
+            for token in difflib.get_close_matches(query, self._tokens.keys(), n=limit, cutoff=0.6):
+                players |= self._tokens[token]
+            if addresses is not None:
+                players = {name for name in players if self._player_servers[name] & addresses}
+
+        results = []
+        for name in sorted(players)[:limit]:
+            servers = self._player_servers[name]
+            results.append((name, servers & addresses if addresses is not None else servers))
+        return results
@@ -0,0 +1,267 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+from astrbot.api.all import logger
+from .l4d2_query import ServerInfo
+
+
+class RawRing:
+    """固定大小的原始采样环形缓冲区：时间戳、人数、是否在线"""
+
+    HEADER = struct.Struct("<III")  # capacity, head, size
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ts = array("d", bytes(8 * capacity))
+        self.count = array("H", bytes(2 * capacity))
+        self.online = array("B", bytes(capacity))
+        self.head = 0  # 下一个写入位置
+        self.size = 0
+
+    def add(self, ts: float, count: int, online: bool):
+        self.ts[self.head] = ts
+        self.count[self.head] = min(count, 0xFFFF)
+        self.online[self.head] = 1 if online else 0
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def arrays(self) -> List[array]:
+        return [self.ts, self.count, self.online]
+
+    def header(self) -> Tuple[int, ...]:
+        return (self.capacity, self.head, self.size)
+
+    def restore(self, header: Tuple[int, ...]):
+        _, self.head, self.size = header
+
+
+class Rollup:
+    """
+    固定大小的聚合环形缓冲区，每个槽位是一个时间桶 (step 秒) 的聚合值
+    当前未结束的时间桶单独累加，结束时写入环形缓冲区并返回给下一级聚合
+    """
+
+    HEADER = struct.Struct("<IIIddIII")  # capacity, head, size, cur_start, cur_total, cur_peak, cur_samples, cur_online
+
+    def __init__(self, step: int, capacity: int):
+        self.step = step
+        self.capacity = capacity
+        self.start = array("d", bytes(8 * capacity))
+        self.total = array("d", bytes(8 * capacity))  # 人数累加值，除以 samples 得到平均人数
+        self.peak = array("H", bytes(2 * capacity))
+        self.samples = array("I", bytes(4 * capacity))
+        self.online = array("I", bytes(4 * capacity))  # 在线的采样数
+        self.head = 0
+        self.size = 0
+        self.cur_start = 0.0
+        self.cur_total = 0.0
+        self.cur_peak = 0
+        self.cur_samples = 0
+        self.cur_online = 0
+
+    def add(self, ts: float, total: float, peak: int, samples: int, online: int) -> Optional[Tuple]:
+        """累加一条 (可能已聚合的) 数据，若上一个时间桶结束则返回该桶"""
+        bucket = ts - ts % self.step
+        flushed = None
+        if bucket != self.cur_start and self.cur_samples:
+            flushed = self._flush()
+        self.cur_start = bucket
+        self.cur_total += total
+        self.cur_peak = max(self.cur_peak, peak)
+        self.cur_samples += samples
+        self.cur_online += online
+        return flushed
+
+    def _flush(self) -> Tuple:
+        i = self.head
+        self.start[i] = self.cur_start
+        self.total[i] = self.cur_total
+        self.peak[i] = min(self.cur_peak, 0xFFFF)
+        self.samples[i] = self.cur_samples
+        self.online[i] = self.cur_online
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        flushed = (self.cur_start, self.cur_total, self.cur_peak, self.cur_samples, self.cur_online)
+        self.cur_total = 0.0
+        self.cur_peak = self.cur_samples = self.cur_online = 0
+        return flushed
+
+    def _ordered(self, arr: array) -> array:
+        """按时间顺序返回有效数据"""
+        if self.size < self.capacity:
+            return arr[:self.size]
+        return arr[self.head:] + arr[:self.head]
+
+    def window(self, since: float) -> Tuple[int, float, float, int]:
+        """统计 since 之后的数据，返回 (峰值, 平均人数, 在线率, 采样数)"""
+        starts = self._ordered(self.start)
+        lo = bisect_left(starts, since - since % self.step)
+        samples = self._ordered(self.samples)[lo:]
+        n = sum(samples) + self.cur_samples
+        if not n:
+            return 0, 0.0, 0.0, 0
+        peak = max(max(self._ordered(self.peak)[lo:], default=0), self.cur_peak)
+        total = sum(self._ordered(self.total)[lo:]) + self.cur_total
+        online = sum(self._ordered(self.online)[lo:]) + self.cur_online
+        return peak, total / n, online / n, n
+
+    def buckets(self, since: float) -> List[Tuple[float, float, int]]:
+        """返回 since 之后每个时间桶的 (开始时间, 平均人数, 采样数)"""
+        starts = self._ordered(self.start)
+        lo = bisect_left(starts, since - since % self.step)
+        totals = self._ordered(self.total)[lo:]
+        samples = self._ordered(self.samples)[lo:]
+        return [(t, total / n, n) for t, total, n in zip(starts[lo:], totals, samples) if n]
+
+    def arrays(self) -> List[array]:
+        return [self.start, self.total, self.peak, self.samples, self.online]
+
+    def header(self) -> Tuple:
+        return (self.capacity, self.head, self.size, self.cur_start, self.cur_total,
+                self.cur_peak, self.cur_samples, self.cur_online)
+
+    def restore(self, header: Tuple):
+        (_, self.head, self.size, self.cur_start, self.cur_total,
+         self.cur_peak, self.cur_samples, self.cur_online) = header
+
+
+class ServerSeries:
+    """单个服务器的人数时间序列：原始采样 + 分钟/小时/天三级聚合"""
+
+    def __init__(self):
+        self.raw = RawRing(1440)
+        self.minute = Rollup(60, 1440)  # 24 小时
+        self.hour = Rollup(3600, 24 * 7)  # 7 天
+        self.day = Rollup(86400, 90)  # 90 天
+
+    def record(self, ts: float, count: int, online: bool):
+        """记录一次轮询结果，逐级增量聚合"""
+        self.raw.add(ts, count, online)
+        flushed = self.minute.add(ts, count, count, 1, 1 if online else 0)
+        if flushed:
+            flushed = self.hour.add(*flushed)
+        if flushed:
+            self.day.add(*flushed)
+
+    def parts(self) -> List:
+        return [self.raw, self.minute, self.hour, self.day]
+
+
+class PlayerStats:
+    """所有服务器的人数历史，可快照到内存映射文件中，重启后快速恢复"""
+
+    MAGIC = b"L4ST"
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self._series: Dict[str, ServerSeries] = {}
+        # 定期保存在线程池中执行，卸载时的最终保存可能与其重叠，两者会写同一个临时文件
+        self._save_lock = threading.Lock()
+
+    def record(self, address: str, info: Optional[ServerInfo], ts: Optional[float] = None):
+        series = self._series.get(address)
+        if not series:
+            series = self._series[address] = ServerSeries()
+        series.record(ts or time.time(), info.player_count if info else 0, bool(info))
+
+    def get(self, address: str) -> Optional[ServerSeries]:
+        return self._series.get(address)
+
+    def summary(self, address: str, days: int) -> Optional[Tuple[int, float, float]]:
+        """最近 days 天的 (峰值, 平均人数, 在线率)，无数据时返回 None"""
+        series = self._series.get(address)
+        if not series:
+            return None
+        since = time.time() - days * 86400
+        # 24 小时内使用分钟级数据，更长时间使用小时级数据
+        rollup = series.minute if days <= 1 else series.hour
+        peak, avg, uptime, samples = rollup.window(since)
+        if not samples:
+            return None
+        return peak, avg, uptime
+
+    def peak_hour(self, address: str) -> Optional[int]:
+        """最近 7 天平均人数最高的时段 (本地时间的小时)"""
+        series = self._series.get(address)
+        if not series:
+            return None
+        totals = [0.0] * 24
+        counts = [0] * 24
+        for start, avg, n in series.hour.buckets(time.time() - 7 * 86400):
+            hour = time.localtime(start).tm_hour
+            totals[hour] += avg * n
+            counts[hour] += n
+        if not any(counts):
+            return None
+        return max(range(24), key=lambda h: totals[h] / counts[h] if counts[h] else -1)
+
+    def save(self):
+        """将所有序列快照写入内存映射文件"""
+        with self._save_lock:
+            self._save()
+
+    def _save(self):
+        chunks = [self.MAGIC, struct.pack("<HI", self.VERSION, len(self._series))]
+        for address, series in self._series.items():
+            key = address.encode("utf-8")
+            chunks.append(struct.pack("<H", len(key)))
+            chunks.append(key)
+            for part in series.parts():
+                chunks.append(part.HEADER.pack(*part.header()))
+                chunks.extend(arr.tobytes() for arr in part.arrays())
+
+        size = sum(len(c) for c in chunks)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w+b") as f:
+            f.truncate(size)
+            with mmap.mmap(f.fileno(), size) as mm:
+                offset = 0
+                for chunk in chunks:
+                    mm[offset:offset + len(chunk)] = chunk
+                    offset += len(chunk)
+                mm.flush()
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """从快照文件恢复，文件不存在或格式不符时从空数据开始"""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        try:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                self._series = self._parse(mm)
+        except Exception as e:
+            logger.error(f"Error loading player stats from {self.path}: {e}")
+            self._series = {}
+
+    def _parse(self, mm: mmap.mmap) -> Dict[str, ServerSeries]:
+        if mm[:4] != self.MAGIC:
+            raise ValueError("invalid stats file")
+        version, count = struct.unpack_from("<HI", mm, 4)
+        if version != self.VERSION:
+            raise ValueError(f"unsupported stats version {version}")
+        offset = 10
+        result = {}
+        for _ in range(count):
+            (key_len,) = struct.unpack_from("<H", mm, offset)
+            offset += 2
+            address = mm[offset:offset + key_len].decode("utf-8")
+            offset += key_len
+            series = ServerSeries()
+            for part in series.parts():
+                header = part.HEADER.unpack_from(mm, offset)
+                offset += part.HEADER.size
+                if header[0] != part.capacity:
+                    raise ValueError("stats capacity mismatch")
+                part.restore(header)
+                for arr in part.arrays():
+                    nbytes = arr.itemsize * part.capacity
+                    arr[:] = array(arr.typecode, mm[offset:offset + nbytes])
+                    offset += nbytes
+            result[address] = series
+        return result
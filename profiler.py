@@ -0,0 +1,170 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+
+class _NullSpan:
+    """未开启分析时使用的空计时器，不产生任何开销"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, profiler: "PluginProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._record_span(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class PluginProfiler:
+    """
+    按需开启的性能分析器：
+    - 采样线程定时抓取所有线程 (包括 run_in_executor 线程) 的调用栈
+    - 监测事件循环延迟，记录阻塞事件循环的慢回调
+    - 统计各指令关键阶段 (span) 的耗时
+    """
+
+    SAMPLE_INTERVAL = 0.005
+    LAG_INTERVAL = 0.05
+    # 事件循环延迟超过该值视为慢回调
+    SLOW_CALLBACK = 0.1
+    # 空闲等待的栈顶函数 (文件名, 函数名)，不计入采样
+    IDLE_FRAMES = {
+        ("selectors.py", "select"),
+        ("threading.py", "wait"),
+        ("thread.py", "_worker"),
+        ("queue.py", "get"),
+    }
+
+    def __init__(self):
+        self.active = False
+        self._lock = threading.Lock()
+        self._spans: Dict[str, List[float]] = {}
+        self._stacks: Counter = Counter()
+        self._leaves: Counter = Counter()
+        self._samples = 0
+        self._lags: List[float] = []
+
+    def span(self, name: str):
+        """统计代码块耗时：with profiler.span("a2s"): ..."""
+        if not self.active:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def _record_span(self, name: str, elapsed: float):
+        with self._lock:
+            self._spans.setdefault(name, []).append(elapsed)
+
+    def _sample_loop(self, stop: threading.Event):
+        me = threading.get_ident()
+        while not stop.wait(self.SAMPLE_INTERVAL):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                leaf = frame.f_code
+                if (os.path.basename(leaf.co_filename), leaf.co_name) in self.IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self._leaves[stack[0]] += 1
+                self._stacks[";".join(reversed(stack))] += 1
+                self._samples += 1
+
+    async def _lag_monitor(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.LAG_INTERVAL
+            await asyncio.sleep(self.LAG_INTERVAL)
+            lag = loop.time() - expected
+            if lag >= self.SLOW_CALLBACK:
+                self._lags.append(lag)
+
+    async def capture(self, seconds: float, out_dir: str) -> Tuple[str, str]:
+        """开启分析 seconds 秒，返回 (摘要, 完整结果文件路径)"""
+        if self.active:
+            raise RuntimeError("profiler is already running")
+        self._spans.clear()
+        self._stacks.clear()
+        self._leaves.clear()
+        self._samples = 0
+        self._lags = []
+
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._sample_loop, args=(stop,), name="l4d2-profiler", daemon=True)
+        lag_task = asyncio.create_task(self._lag_monitor())
+        self.active = True
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.active = False
+            stop.set()
+            lag_task.cancel()
+            await asyncio.get_running_loop().run_in_executor(None, sampler.join)
+
+        path = self._save(out_dir)
+        return self._summary(seconds), path
+
+    def _span_lines(self) -> List[str]:
+        lines = []
+        for name, values in sorted(self._spans.items(), key=lambda kv: -sum(kv[1])):
+            avg = sum(values) / len(values) * 1000
+            lines.append(f"{name}: {len(values)}次 平均 {avg:.1f}ms 最大 {max(values) * 1000:.1f}ms")
+        return lines
+
+    def _summary(self, seconds: float, top: int = 10) -> str:
+        lines = [f"=== 性能分析 ({int(seconds)}秒) ===", f"采样数: {self._samples}"]
+        if self._lags:
+            lines.append(f"事件循环阻塞: {len(self._lags)}次，最长 {max(self._lags) * 1000:.0f}ms")
+        else:
+            lines.append("事件循环阻塞: 无")
+
+        span_lines = self._span_lines()
+        if span_lines:
+            lines.append("")
+            lines.append("阶段耗时:")
+            lines.extend(span_lines)
+
+        if self._samples:
+            lines.append("")
+            lines.append("热点函数:")
+            for frame, count in self._leaves.most_common(top):
+                lines.append(f"{count / self._samples:.1%} {frame}")
+        return "\n".join(lines)
+
+    def _save(self, out_dir: str) -> str:
+        """保存完整结果：阶段耗时 + 折叠调用栈 (可用 flamegraph.pl / speedscope 查看)"""
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, time.strftime("profile-%Y%m%d-%H%M%S.txt"))
+        with open(path, "w", encoding="utf-8") as f:
+            for line in self._span_lines():
+                f.write(f"# {line}\n")
+            for lag in self._lags:
+                f.write(f"# slow callback {lag * 1000:.0f}ms\n")
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+# 插件内共享的分析器实例
+profiler = PluginProfiler()
@@ -0,0 +1,202 @@
+import time
+from bisect import bisect_right
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from .l4d2_query import ServerInfo, PlayerInfo, ServerStats, describe_mode
+
+# 显示宽度为 2 的字符区间 (东亚宽字符、全角字符、emoji)
+_WIDE_RANGES = [
+    (0x1100, 0x115F), (0x231A, 0x231B), (0x2329, 0x232A), (0x23E9, 0x23EC),
+    (0x23F0, 0x23F0), (0x23F3, 0x23F3), (0x25FD, 0x25FE), (0x2614, 0x2615),
+    (0x2648, 0x2653), (0x267F, 0x267F), (0x2693, 0x2693), (0x26A1, 0x26A1),
+    (0x26AA, 0x26AB), (0x26BD, 0x26BE), (0x26C4, 0x26C5), (0x26CE, 0x26CE),
+    (0x26D4, 0x26D4), (0x26EA, 0x26EA), (0x26F2, 0x26F3), (0x26F5, 0x26F5),
+    (0x26FA, 0x26FA), (0x26FD, 0x26FD), (0x2705, 0x2705), (0x270A, 0x270B),
+    (0x2728, 0x2728), (0x274C, 0x274C), (0x274E, 0x274E), (0x2753, 0x2755),
+    (0x2757, 0x2757), (0x2795, 0x2797), (0x27B0, 0x27B0), (0x27BF, 0x27BF),
+    (0x2B1B, 0x2B1C), (0x2B50, 0x2B50), (0x2B55, 0x2B55), (0x2E80, 0x303E),
+    (0x3041, 0x33FF), (0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xA000, 0xA4CF),
+    (0xA960, 0xA97F), (0xAC00, 0xD7A3), (0xF900, 0xFAFF), (0xFE10, 0xFE19),
+    (0xFE30, 0xFE6F), (0xFF00, 0xFF60), (0xFFE0, 0xFFE6),
+    (0x16FE0, 0x16FE4), (0x17000, 0x18AFF), (0x1B000, 0x1B2FF),
+    (0x1F004, 0x1F004), (0x1F0CF, 0x1F0CF), (0x1F18E, 0x1F18E), (0x1F191, 0x1F19A),
+    (0x1F200, 0x1F202), (0x1F210, 0x1F23B), (0x1F240, 0x1F248), (0x1F250, 0x1F251),
+    (0x1F260, 0x1F265), (0x1F300, 0x1F64F), (0x1F680, 0x1F6FF), (0x1F7E0, 0x1F7EB),
+    (0x1F90C, 0x1F9FF), (0x1FA70, 0x1FAFF), (0x20000, 0x2FFFD), (0x30000, 0x3FFFD),
+]
+
+# 显示宽度为 0 的字符区间 (组合附加符号、零宽字符、变体选择符)
+_ZERO_RANGES = [
+    (0x0300, 0x036F), (0x0483, 0x0489), (0x0591, 0x05BD), (0x0610, 0x061A),
+    (0x064B, 0x065F), (0x1AB0, 0x1AFF), (0x1DC0, 0x1DFF), (0x200B, 0x200F),
+    (0x2060, 0x2064), (0x20D0, 0x20FF), (0xFE00, 0xFE0F), (0xFE20, 0xFE2F),
+    (0x1F3FB, 0x1F3FF), (0xE0000, 0xE007F), (0xE0100, 0xE01EF),
+]
+
+
+def _build_bmp_table() -> bytearray:
+    """预先计算基本多文种平面 (BMP) 所有字符的显示宽度"""
+    table = bytearray(b"\x01") * 0x10000
+    for width, ranges in ((2, _WIDE_RANGES), (0, _ZERO_RANGES)):
+        for start, end in ranges:
+            if start < 0x10000:
+                table[start:end + 1] = bytes([width]) * (end + 1 - start)
+    return table
+
+
+_BMP_WIDTHS = _build_bmp_table()
+
+# BMP 以外的字符按区间二分查找，区间按起点排序
+_ASTRAL = sorted(
+    [(s, e, 2) for s, e in _WIDE_RANGES if s >= 0x10000]
+    + [(s, e, 0) for s, e in _ZERO_RANGES if s >= 0x10000]
+)
+_ASTRAL_STARTS = [s for s, _, _ in _ASTRAL]
+
+
+def char_width(char: str) -> int:
+    """单个字符的显示宽度"""
+    code = ord(char)
+    if code < 0x10000:
+        return _BMP_WIDTHS[code]
+    i = bisect_right(_ASTRAL_STARTS, code) - 1
+    if i >= 0 and code <= _ASTRAL[i][1]:
+        return _ASTRAL[i][2]
+    return 1
+
+
+@lru_cache(maxsize=4096)
+def text_width(text: str) -> int:
+    """计算字符串显示宽度 (中文、全角字符和 emoji 计为2)"""
+    if text.isascii():
+        return len(text)
+    return sum(map(char_width, text))
+
+
+@lru_cache(maxsize=4096)
+def truncate_text(text: str, max_width: int) -> str:
+    """根据显示宽度截断字符串"""
+    if text_width(text) <= max_width:
+        return text
+
+    current_width = 0
+    for i, char in enumerate(text):
+        current_width += char_width(char)
+        if current_width > max_width:
+            return text[:i] + "..."
+    return text
+
+
+def make_padding(width: int) -> str:
+    """生成填充字符串，优先使用全角空格"""
+    return "\u3000" * (width // 2) + " " * (width % 2)
+
+
+def format_duration(seconds: float) -> str:
+    """格式化玩家在线时长，例如 1:02:03"""
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    d, h = divmod(h, 24)
+    if d > 0:
+        return f"{d}:{h:02d}:{m:02d}:{s:02d}"
+    if h > 0:
+        return f"{h}:{m:02d}:{s:02d}"
+    return f"{m}:{s:02d}"
+
+
+def connect_line(base_url: str, ip: str, port: int) -> str:
+    """生成一键连接链接或 connect 指令"""
+    if base_url:
+        return f"点击直连: {base_url.rstrip('/')}/{ip}:{port}"
+    return f"连接指令: connect {ip}:{port}"
+
+
+def format_stats(stats: ServerStats) -> str:
+    """服务器的滚动查询统计，例如 平均延迟 48ms，成功率 98% (共 120 次查询)"""
+    queries, failures, avg_ping, _ = stats.snapshot()
+    if not queries:
+        return ""
+    rate = (queries - failures) * 100 // queries
+    return f"平均延迟 {avg_ping:.0f}ms，成功率 {rate}% (共 {queries} 次查询)"
+
+
+def format_last_online(stats: ServerStats) -> str:
+    """服务器最后一次响应查询距今的时间，从未在线时返回空字符串"""
+    last_online = stats.snapshot()[3]
+    if not last_online:
+        return ""
+    return f"最后在线: {format_duration(time.time() - last_online)} 前"
+
+
+def format_server_status(info: ServerInfo, players: Optional[Tuple[PlayerInfo, ...]],
+                         connect: str, address: str = "", stats: Optional[ServerStats] = None) -> str:
+    """单个服务器的详细状态消息 (查询 / connect 共用)"""
+    lines = [f"服务器: {info.server_name}"]
+    if address:
+        lines.append(f"地址: {address}")
+    lines.append(f"地图: {info.map_name}")
+    lines.append(f"人数: {info.player_count}/{info.max_players}")
+    mode = describe_mode(info.game_mode, info.difficulty)
+    if mode:
+        lines.append(f"模式: {mode}")
+    lines.append(f"延迟: {info.ping}ms")
+    summary = format_stats(stats) if stats else ""
+    if summary:
+        lines.append(f"统计: {summary}")
+    lines.append("")
+
+    if players:
+        lines.append("在线玩家:")
+        lines.extend(f"- {p.name} ({format_duration(p.duration)})" for p in players)
+    else:
+        lines.append("当前无玩家在线。")
+
+    lines.append("")
+    lines.append(connect)
+    return "\n".join(lines)
+
+
+def short_map_name(map_name: str) -> str:
+    """地图真名可能带有 "|" 分隔的附加信息，概览中只显示第一部分"""
+    if "|" in map_name:
+        return map_name.split("|")[0].strip()
+    return map_name
+
+
+def render_overview(results: List[Tuple[str, Optional[ServerInfo]]]) -> str:
+    """综合查询的服务器概览消息，results 为 [(服务器别名, info)]，离线时 info 为 None"""
+    online = [info for _, info in results if info]
+    total_players = sum(info.player_count for info in online)
+    total_slots = sum(info.max_players for info in online)
+    # 人数显示字符串的最大长度，用于对齐
+    max_player_len = max((len(f"{info.player_count}/{info.max_players}") for info in online), default=0)
+
+    lines = [
+        "=== L4D2 服务器概览 ===",
+        f"服务器: {len(online)}/{len(results)} 在线",
+        f"人数: {total_players}/{total_slots}",
+        "-" * 25,
+    ]
+    for alias, info in results:
+        prefix = f"[{alias}]"
+        if not info:
+            lines.append(f"{prefix} 离线或无法连接")
+            continue
+
+        # 增加一个空格的缩进，以匹配第一行的空格
+        padding = make_padding(text_width(prefix)) + " "
+        p_str = f"{info.player_count}/{info.max_players}"
+        # 针对非等宽字体优化：少一个字符补两个空格
+        p_padding = " " * ((max_player_len - len(p_str)) * 2)
+        # 截断地图名，最大显示宽度15；服务器名最大显示宽度20
+        map_name = truncate_text(short_map_name(info.map_name), 15)
+
+        # 别名和服务器名之间增加空格，人数放前面(左对齐)，地图放后面
+        lines.append(f"{prefix} {truncate_text(info.server_name, 20)}")
+        second = f"{padding}{p_str}{p_padding}   {map_name}"
+        mode = describe_mode(info.game_mode, info.difficulty)
+        if mode:
+            second += f"   {mode}"
+        lines.append(second)
+
+    return "\n".join(lines) + "\n"
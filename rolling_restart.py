@@ -0,0 +1,135 @@
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+from .l4d2_query import L4D2Server
+
+# RCON 重启指令成功时的返回值，见 RCONClient.execute
+RESTART_OK = "指令已发送。服务器正在重启..."
+
+
+class RollingRestarter:
+    """分批滚动重启服务器，保证重启过程中始终有服务器可用"""
+
+    def __init__(self, wave_size: int = 1, boot_timeout: float = 180.0,
+                 down_timeout: float = 30.0, poll_interval: float = 3.0,
+                 defer_delay: float = 60.0, max_deferrals: int = 3):
+        self.wave_size = max(1, wave_size)
+        self.boot_timeout = boot_timeout  # 等待服务器重新响应 A2S 的最长时间
+        self.down_timeout = down_timeout  # 等待服务器下线的最长时间
+        self.poll_interval = poll_interval
+        self.defer_delay = defer_delay  # 没有可以立即重启的服务器时，等待多久再重试
+        self.max_deferrals = max_deferrals  # 服务器最多推迟几次，超过则跳过
+
+    async def run(self, targets: List[Tuple[str, L4D2Server, str]],
+                  others: Sequence[L4D2Server] = ()) -> AsyncIterator[str]:
+        """
+        依次重启 targets 中的服务器 (名称, server, rcon_password)，逐步产出进度消息
+        others 为同组中不参与重启的服务器 (例如未配置 RCON 密码)，只用于计算当前在线容量
+        """
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        group = [server for _, server, _ in targets] + list(others)
+
+        queue = deque((name, server, password, 0) for name, server, password in targets)
+        durations: List[Tuple[str, float]] = []
+        skipped: List[str] = []
+        failed: List[str] = []
+        wave_no = 0
+
+        while queue:
+            # 每批开始前重新查询整组服务器，按当前在线数量决定本批最多重启几台
+            infos = await asyncio.gather(*[loop.run_in_executor(None, s.query_info) for s in group])
+            online = {id(server) for server, info in zip(group, infos) if info}
+            players = {id(server): info.player_count for server, info in zip(group, infos) if info}
+            # 至少保留一台在线服务器不在重启中，避免整组同时下线
+            capacity = self.wave_size if len(group) <= 1 else min(self.wave_size, len(online) - 1)
+
+            # 从整个队列中选出空闲的服务器填满本批，有玩家或超出容量的留在队列中
+            to_restart = []
+            waiting = deque()
+            for name, server, password, deferrals in queue:
+                if id(server) not in online:
+                    skipped.append(f"{name} (离线)")
+                elif players[id(server)] == 0 and len(to_restart) < capacity:
+                    to_restart.append((name, server, password))
+                else:
+                    waiting.append((name, server, password, deferrals))
+            queue = waiting
+
+            if not to_restart:
+                if not queue:
+                    break
+                # 没有可以立即重启的服务器：推迟计数加一，超过上限的服务器跳过
+                queue = deque((n, s, p, d + 1) for n, s, p, d in queue)
+                for name, server, _, deferrals in queue:
+                    if deferrals > self.max_deferrals:
+                        reason = "持续有玩家" if players[id(server)] > 0 else "无其他在线服务器"
+                        skipped.append(f"{name} ({reason})")
+                queue = deque(entry for entry in queue if entry[3] <= self.max_deferrals)
+                if queue:
+                    yield f"暂无可重启的服务器 (有玩家在线或需保留在线容量)，{int(self.defer_delay)} 秒后重试..."
+                    await asyncio.sleep(self.defer_delay)
+                continue
+
+            wave_no += 1
+            names = "、".join(n for n, _, _ in to_restart)
+            yield f"第 {wave_no} 批：正在重启 {names}..."
+
+            results = await asyncio.gather(*[self._restart_and_wait(s, p) for _, s, p in to_restart])
+            wave_failed = []
+            for (name, _, _), (elapsed, reason) in zip(to_restart, results):
+                if elapsed is None:
+                    wave_failed.append(f"{name} ({reason})")
+                else:
+                    durations.append((name, elapsed))
+
+            if wave_failed:
+                # 有服务器重启失败，停止后续批次以保证可用容量
+                failed.extend(wave_failed)
+                yield "、".join(wave_failed) + "，已中止滚动重启。"
+                break
+
+            yield f"第 {wave_no} 批完成：" + "、".join(f"{n} {t:.1f}s" for n, t in durations[-len(to_restart):])
+
+        total = time.monotonic() - started
+        lines = ["=== 滚动重启结果 ==="]
+        lines.append(f"总耗时: {total:.1f}s")
+        lines.append(f"已重启: {len(durations)}/{len(targets)}")
+        for name, elapsed in durations:
+            lines.append(f"- {name}: {elapsed:.1f}s")
+        if skipped:
+            lines.append("已跳过: " + "、".join(skipped))
+        if failed:
+            lines.append("失败: " + "、".join(failed))
+        yield "\n".join(lines)
+
+    async def _restart_and_wait(self, server: L4D2Server, password: str) -> Tuple[Optional[float], str]:
+        """重启单个服务器并等待其重新响应 A2S，返回 (耗时, 失败原因)，失败时耗时为 None"""
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(loop.run_in_executor(None, server.restart, password), timeout=15.0)
+        except asyncio.TimeoutError:
+            return None, "RCON 超时"
+        if result != RESTART_OK:
+            return None, f"重启指令失败: {result}"
+
+        # 1. 等待服务器下线，重启指令生效前服务器可能仍会短暂响应
+        went_down = False
+        deadline = time.monotonic() + self.down_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            if not await loop.run_in_executor(None, server.query_info):
+                went_down = True
+                break
+        if not went_down:
+            return None, f"{int(self.down_timeout)} 秒内未下线，未重启"
+
+        # 2. 等待服务器重新响应
+        deadline = started + self.boot_timeout
+        while time.monotonic() < deadline:
+            if await loop.run_in_executor(None, server.query_info):
+                return time.monotonic() - started, ""
+            await asyncio.sleep(self.poll_interval)
+        return None, f"{int(self.boot_timeout)} 秒内未恢复响应"
@@ -0,0 +1,87 @@
+import asyncio
+import ipaddress
+import socket
+import time
+from typing import Dict, Any, List
+from astrbot.api.all import logger
+from .l4d2_query import L4D2Server
+
+
+class ServerRegistry:
+    """长期持有的服务器注册表，每个配置地址对应一个 L4D2Server 实例，所有指令共享"""
+
+    def __init__(self, dns_ttl: float = 300.0):
+        self.dns_ttl = dns_ttl
+        self.map_name_url = ""
+        # address -> L4D2Server
+        self._servers: Dict[str, L4D2Server] = {}
+        # 正在进行的 DNS 解析，避免重复发起
+        self._resolving: Dict[str, asyncio.Task] = {}
+
+    def load(self, group_configs: List[Dict[str, Any]], map_name_url: str):
+        """根据配置重建注册表，已存在的地址保留原实例及其统计数据"""
+        self.map_name_url = map_name_url
+        servers = {}
+        for group_conf in group_configs:
+            for conf in group_conf.get("servers", []):
+                address = conf["address"]
+                if address in servers:
+                    continue
+                server = self._servers.get(address)
+                if not server:
+                    server = L4D2Server(conf["name"], address, map_name_url)
+                    self._schedule_resolve(server)
+                server.map_name_url = map_name_url
+                servers[address] = server
+        self._servers = servers
+
+    def get(self, address: str) -> L4D2Server:
+        """获取地址对应的服务器，未注册的地址返回临时实例 (不加入注册表)"""
+        server = self._servers.get(address)
+        if not server:
+            return L4D2Server(address, address, self.map_name_url)
+        if time.time() - server.resolved_at >= self.dns_ttl:
+            self._schedule_resolve(server)
+        return server
+
+    def servers(self) -> Dict[str, L4D2Server]:
+        """所有已注册的服务器 address -> L4D2Server"""
+        return self._servers
+
+    def refresh_due(self):
+        """为 DNS 解析结果已过期的服务器安排后台刷新，由后台轮询每轮调用"""
+        now = time.time()
+        for server in self._servers.values():
+            if now - server.resolved_at >= self.dns_ttl:
+                self._schedule_resolve(server)
+
+    def _schedule_resolve(self, server: L4D2Server):
+        """在后台刷新服务器的 DNS 解析结果，本次查询仍使用旧结果"""
+        if server.address in self._resolving:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._resolve(server))
+        self._resolving[server.address] = task
+        task.add_done_callback(lambda _: self._resolving.pop(server.address, None))
+
+    async def _resolve(self, server: L4D2Server):
+        try:
+            ipaddress.ip_address(server.ip)
+            # 已经是 IP 地址，无需解析
+            server.resolved_ip = server.ip
+            server.resolved_at = float("inf")
+            return
+        except ValueError:
+            pass
+
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(server.ip, server.port, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+            server.resolved_ip = infos[0][4][0]
+        except Exception as e:
+            # 解析失败时保留旧结果，下次查询再重试
+            logger.error(f"Error resolving {server.ip}: {e}")
+        server.resolved_at = time.time()
@@ -0,0 +1,83 @@
+import time
+from typing import Dict, List, Optional, Tuple
+from .l4d2_query import ServerInfo
+
+
+class ServerWatcher:
+    """比较相邻两次轮询的服务器状态，在发生换图、满人、空服、离线等变化时生成通知"""
+
+    # 可订阅的事件类型 -> 显示名称
+    EVENTS = {
+        "map": "换图",
+        "full": "满人",
+        "empty": "空服",
+        "offline": "离线",
+        "online": "上线",
+    }
+    # 单个群待发送通知的最大条数，超出的旧通知将被丢弃
+    MAX_PENDING = 20
+
+    def __init__(self):
+        # address -> 状态指纹，None 表示离线
+        self._fingerprints: Dict[str, Optional[Tuple[str, bool, bool]]] = {}
+        # 群号 -> 上次发送时间
+        self._last_sent: Dict[str, float] = {}
+        # 群号 -> 待发送的通知 (受限流影响暂未发出)
+        self._pending: Dict[str, List[str]] = {}
+
+    @staticmethod
+    def fingerprint(info: Optional[ServerInfo]) -> Optional[Tuple[str, bool, bool]]:
+        """状态指纹：(地图代码, 是否满人, 是否空服)，离线为 None"""
+        if not info:
+            return None
+        count = info.player_count
+        # 使用原始地图代码，显示名称可能因 mapNameUrl 查询失败而在真名和代码之间来回变化
+        return (info.map_code or info.map_name, count >= info.max_players > 0, count == 0)
+
+    def observe(self, address: str, info: Optional[ServerInfo]) -> List[Tuple[str, str]]:
+        """记录服务器最新状态，返回发生的事件列表 [(事件类型, 描述)]"""
+        new = self.fingerprint(info)
+        first_seen = address not in self._fingerprints
+        old = self._fingerprints.get(address)
+        self._fingerprints[address] = new
+
+        # 首次观测只记录基线，指纹未变化时无需逐项比较
+        if first_seen or old == new:
+            return []
+
+        if new is None:
+            return [("offline", "离线")]
+        if old is None:
+            return [("online", f"上线 {info.map_name}")]
+
+        events = []
+        if old[0] != new[0]:
+            events.append(("map", f"换图 {info.map_name}"))
+        if new[1] and not old[1]:
+            events.append(("full", f"满人 {info.player_count}/{info.max_players}"))
+        if new[2] and not old[2]:
+            events.append(("empty", "空服"))
+        return events
+
+    def forget(self, addresses) -> None:
+        """移除不再轮询的服务器"""
+        for address in set(self._fingerprints) - set(addresses):
+            del self._fingerprints[address]
+
+    def queue(self, group_id: str, lines: List[str]) -> None:
+        """将通知加入群的待发送队列"""
+        pending = self._pending.setdefault(group_id, [])
+        pending.extend(lines)
+        del pending[:-self.MAX_PENDING]
+
+    def take(self, group_id: str, min_interval: float) -> Optional[str]:
+        """若未超过限流，取出群的待发送通知并合并为一条消息"""
+        pending = self._pending.get(group_id)
+        if not pending:
+            return None
+        now = time.monotonic()
+        if now - self._last_sent.get(group_id, float("-inf")) < min_interval:
+            return None
+        self._last_sent[group_id] = now
+        self._pending[group_id] = []
+        return "=== 服务器动态 ===\n" + "\n".join(pending)
@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import multiprocessing
+import sys
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from astrbot.api.all import logger
+from .l4d2_query import L4D2Server, ServerInfo, PlayerInfo, info_delta
+from .snapshot_store import PollResults
+
+# 工作进程中表示 "尚无快照" 的标记，与离线 (None) 区分
+_MISSING = object()
+# 每轮都会变化的字段 (延迟、玩家在线时长) 只在状态变化时或每隔多少轮随快照发送一次
+VOLATILE_REFRESH = 10
+_VOLATILE_FIELDS = frozenset({"ping"})
+
+
+class HashRing:
+    """一致性哈希环，按地址把服务器分配给工作进程，增减进程时只迁移少量服务器"""
+
+    def __init__(self, shards: int, replicas: int = 64):
+        points = []
+        for shard in range(shards):
+            for i in range(replicas):
+                points.append((self._hash(f"{shard}-{i}"), shard))
+        points.sort()
+        self._keys = [k for k, _ in points]
+        self._shards = [s for _, s in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def shard_for(self, address: str) -> int:
+        i = bisect_right(self._keys, self._hash(address)) % len(self._keys)
+        return self._shards[i]
+
+
+def _poll_server(server: L4D2Server) -> Tuple[Optional[ServerInfo], Optional[Tuple[PlayerInfo, ...]]]:
+    info = server.query_info()
+    players = None
+    if info and info.player_count > 0:
+        players = server.query_players()
+    return info, players
+
+
+def _player_names(players: Optional[Tuple[PlayerInfo, ...]]) -> Optional[Tuple[str, ...]]:
+    return tuple(p.name for p in players) if players is not None else None
+
+
+def _worker_main(conn, map_name_url: str, threads: int):
+    """
+    工作进程：轮询分配到的服务器，只把与上次不同的部分发回主进程
+    服务器信息变化时发送变化的字段 (首次或上下线时发送完整快照)，玩家名单变化时发送完整列表；
+    只有延迟或在线时长变化时不发送，每 VOLATILE_REFRESH 轮才随快照刷新一次
+    last 记录的是主进程持有的快照，未发送的变化不写入 last
+    每轮结果带上主进程发来的序号；收到 resync 时清空上次快照，下一轮发送完整快照
+    """
+    servers: Dict[str, L4D2Server] = {}
+    last: Dict[str, tuple] = {}
+    rounds = 0
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        while True:
+            try:
+                command, payload = conn.recv()
+            except EOFError:
+                break
+            if command == "assign":
+                servers = {address: servers.get(address) or L4D2Server(address, address, map_name_url) for address in payload}
+                last = {address: snap for address, snap in last.items() if address in servers}
+            elif command == "resync":
+                last = {}
+            elif command == "poll":
+                info_deltas = {}
+                player_deltas = {}
+                refresh = rounds % VOLATILE_REFRESH == 0
+                rounds += 1
+                for address, (info, players) in zip(servers, pool.map(_poll_server, servers.values())):
+                    old_info, old_players = last.get(address, (_MISSING, _MISSING))
+                    sent_info, sent_players = old_info, old_players
+                    if info != old_info:
+                        if info is None or old_info is None or old_info is _MISSING:
+                            info_deltas[address] = sent_info = info
+                        else:
+                            delta = info_delta(old_info, info)
+                            if refresh or not delta.keys() <= _VOLATILE_FIELDS:
+                                info_deltas[address] = delta
+                                sent_info = info
+                    if players != old_players:
+                        if refresh or old_players is _MISSING or _player_names(players) != _player_names(old_players):
+                            player_deltas[address] = sent_players = players
+                    last[address] = (sent_info, sent_players)
+                conn.send((payload, info_deltas, player_deltas))
+            elif command == "stop":
+                break
+    conn.close()
+
+
+class ShardedPoller:
+    """多进程分片轮询：按一致性哈希把服务器分配到多个进程，进程间只传输快照增量"""
+
+    # 等待单个进程返回一轮结果的最短时间 (秒)，超时视为卡死并重启该进程
+    MIN_POLL_TIMEOUT = 10.0
+    # 停止时等待所有进程退出的总时间 (秒)
+    STOP_TIMEOUT = 5.0
+
+    def __init__(self, workers: int, map_name_url: str, threads: int = 32):
+        self.workers = workers
+        self.map_name_url = map_name_url
+        self.threads = threads
+        self._ring = HashRing(workers)
+        self._procs: List[multiprocessing.Process] = []
+        self._conns = []
+        # 各进程负责的服务器地址，重启进程时重新分配
+        self._shards: List[List[str]] = [[] for _ in range(workers)]
+        # address -> 最新快照 (info, players)
+        self._latest: PollResults = {}
+        self._lock = asyncio.Lock()
+        # 轮询序号，用于丢弃上一轮未及时收到的过期结果
+        self._seq = 0
+        # 与主进程快照不同步、下一轮需要发送完整快照的进程
+        self._resync = set()
+        # 等待进程结果和重启进程使用独立的线程池，每个进程一个线程，
+        # 等待时长可达一个轮询间隔，不能占用指令处理共用的默认线程池
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="l4d2-shard")
+
+    def _spawn(self):
+        # 使用 spawn 避免在带有事件循环和线程的进程中 fork
+        ctx = multiprocessing.get_context("spawn")
+        parent, child = ctx.Pipe()
+        proc = ctx.Process(target=_worker_main, args=(child, self.map_name_url, self.threads), daemon=True)
+        proc.start()
+        child.close()
+        return proc, parent
+
+    def start(self):
+        for _ in range(self.workers):
+            proc, conn = self._spawn()
+            self._procs.append(proc)
+            self._conns.append(conn)
+
+    def _restart_worker(self, shard: int):
+        """结束已退出或卡死的进程并启动新进程，新进程没有旧快照，首轮会发送完整快照"""
+        old_proc, old_conn = self._procs[shard], self._conns[shard]
+        old_conn.close()
+        if old_proc.is_alive():
+            old_proc.kill()
+        old_proc.join(timeout=1)
+        proc, conn = self._spawn()
+        conn.send(("assign", self._shards[shard]))
+        self._procs[shard], self._conns[shard] = proc, conn
+        self._resync.discard(shard)
+
+    def assign(self, addresses: List[str]):
+        """按地址重新分配各进程负责的服务器"""
+        shards: List[List[str]] = [[] for _ in range(self.workers)]
+        for address in addresses:
+            shards[self._ring.shard_for(address)].append(address)
+        self._shards = shards
+        for i, (conn, shard) in enumerate(zip(self._conns, shards)):
+            try:
+                conn.send(("assign", shard))
+            except OSError:
+                self._restart_worker(i)
+        assigned = set(addresses)
+        self._latest = {address: snap for address, snap in self._latest.items() if address in assigned}
+
+    async def poll(self, timeout: float = 0.0) -> PollResults:
+        """
+        所有进程并行轮询一轮，合并增量后返回完整结果 address -> (info, players)
+        timeout 通常为轮询间隔，进程未在时限内返回或已退出时重启该进程，其服务器本轮保留上次结果
+        """
+        timeout = max(timeout, self.MIN_POLL_TIMEOUT)
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            self._seq += 1
+            for shard, conn in enumerate(self._conns):
+                try:
+                    if shard in self._resync:
+                        conn.send(("resync", None))
+                        self._resync.discard(shard)
+                    conn.send(("poll", self._seq))
+                except OSError:
+                    # 进程已退出，接收时会失败并重启
+                    pass
+            deadline = time.monotonic() + timeout
+            deltas = await asyncio.gather(
+                *[loop.run_in_executor(self._executor, self._receive, conn, self._seq, deadline) for conn in self._conns],
+                return_exceptions=True)
+            for shard, result in enumerate(deltas):
+                if isinstance(result, BaseException):
+                    # 进程可能已更新了自己的快照，主进程却没有收到增量，重启后从完整快照重新同步
+                    logger.error(f"[L4D2Plugin] Poll worker {shard} failed, restarting: {result!r}")
+                    await loop.run_in_executor(self._executor, self._restart_worker, shard)
+                    continue
+                info_deltas, player_deltas = result
+                if not self._apply(info_deltas, player_deltas):
+                    self._resync.add(shard)
+        return dict(self._latest)
+
+    @staticmethod
+    def _receive(conn, seq: int, deadline: float) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """在 deadline 之前接收本轮结果，跳过之前轮次遗留的过期结果"""
+        while True:
+            if not conn.poll(max(0.0, deadline - time.monotonic())):
+                raise TimeoutError("poll worker did not reply in time")
+            reply_seq, info_deltas, player_deltas = conn.recv()
+            if reply_seq == seq:
+                return info_deltas, player_deltas
+
+    def _apply(self, info_deltas: Dict[str, Any], player_deltas: Dict[str, Any]) -> bool:
+        """合并增量，遇到缺少基准快照的字段增量时返回 False，需要重新同步"""
+        in_sync = True
+        for address, delta in info_deltas.items():
+            old_info, players = self._latest.get(address, (None, None))
+            # 反序列化得到的字符串不是驻留的，重新驻留以便与其他快照共享
+            if isinstance(delta, dict):
+                if old_info is None:
+                    in_sync = False
+                    continue
+                info = old_info._replace(**{k: sys.intern(v) if isinstance(v, str) else v for k, v in delta.items()})
+            elif delta is not None:
+                info = ServerInfo(*(sys.intern(v) if isinstance(v, str) else v for v in delta))
+            else:
+                info = None
+            self._latest[address] = (info, players)
+        for address, players in player_deltas.items():
+            info, _ = self._latest.get(address, (None, None))
+            self._latest[address] = (info, players)
+        return in_sync
+
+    def stop(self):
+        """通知所有进程退出，共用一个等待时限，超时仍未退出的进程直接结束 (会阻塞，应在线程池中调用)"""
+        for conn in self._conns:
+            try:
+                conn.send(("stop", None))
+                conn.close()
+            except OSError:
+                pass
+        deadline = time.monotonic() + self.STOP_TIMEOUT
+        for proc in self._procs:
+            proc.join(timeout=max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.terminate()
+        self._procs.clear()
+        self._conns.clear()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,54 @@
+import time
+from typing import Dict, Optional, Tuple
+from .l4d2_query import ServerInfo, PlayerInfo
+
+# 一次轮询的结果 address -> (info, players)，离线时 info 为 None
+PollResults = Dict[str, Tuple[Optional[ServerInfo], Optional[Tuple[PlayerInfo, ...]]]]
+
+
+class SnapshotStore:
+    """
+    各服务器最新的轮询快照，状态未变化时保留原对象，只有变化的服务器才会替换
+    延迟和玩家在线时长每轮都会变化，不参与比较，快照中的这两项是最后一次状态变化时的值
+    """
+
+    def __init__(self):
+        # address -> (info, players, 最后变化时间)
+        self._snapshots: Dict[str, Tuple[Optional[ServerInfo], Optional[Tuple[PlayerInfo, ...]], float]] = {}
+        # address -> 状态键，见 state_key
+        self._keys: Dict[str, Optional[Tuple]] = {}
+        # 每次有服务器状态变化时递增，供缓存判断是否过期
+        self.version = 0
+
+    @staticmethod
+    def state_key(info: Optional[ServerInfo], players: Optional[Tuple[PlayerInfo, ...]]) -> Optional[Tuple]:
+        """用于判断状态是否变化的稳定字段：地图、人数、模式和玩家名，不含延迟和在线时长"""
+        if not info:
+            return None
+        return (info.server_name, info.map_name, info.player_count, info.max_players,
+                info.game_mode, info.difficulty, tuple(p.name for p in players or ()))
+
+    def update(self, results: PollResults) -> bool:
+        """写入一轮轮询结果，返回是否有变化"""
+        now = time.time()
+        changed = False
+        for address, (info, players) in results.items():
+            key = self.state_key(info, players)
+            if address in self._snapshots and self._keys[address] == key:
+                continue
+            changed = True
+            self._snapshots[address] = (info, players, now)
+            self._keys[address] = key
+        if changed:
+            self.version += 1
+        return changed
+
+    def get(self, address: str) -> Tuple[Optional[ServerInfo], Optional[Tuple[PlayerInfo, ...]], float]:
+        """获取服务器最新快照 (info, players, 最后变化时间)，无数据时 info 为 None"""
+        return self._snapshots.get(address, (None, None, 0.0))
+
+    def retain(self, addresses) -> None:
+        """移除不再轮询的服务器"""
+        for address in set(self._snapshots) - set(addresses):
+            del self._snapshots[address]
+            del self._keys[address]
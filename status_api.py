@@ -0,0 +1,106 @@
+import hashlib
+import json
+from typing import Dict, Any, List, Optional, Tuple
+from aiohttp import web
+from astrbot.api.all import logger
+from .config_manager import ConfigManager
+from .l4d2_query import describe_mode
+from .snapshot_store import SnapshotStore
+
+
+class StatusAPI:
+    """只读 JSON 状态接口，直接使用后台轮询的结果，不额外查询服务器"""
+
+    # 缓存的响应数量上限
+    MAX_CACHED = 256
+
+    def __init__(self, cfg: ConfigManager, snapshots: SnapshotStore):
+        self.cfg = cfg
+        self.snapshots = snapshots
+        # 请求路径 -> (快照版本, body, etag)，快照版本变化时重新生成
+        self._responses: Dict[str, Tuple[int, bytes, str]] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self, host: str, port: int):
+        app = web.Application()
+        app.router.add_get("/servers", self._handle_servers)
+        app.router.add_get("/servers/{name}", self._handle_server)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info(f"[L4D2Plugin] Status API listening on http://{host}:{port}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _server_json(self, conf: Dict[str, Any], with_players: bool) -> Dict[str, Any]:
+        info, players, updated = self.snapshots.get(conf["address"])
+        data = {"name": conf["name"], "address": conf["address"], "online": bool(info), "updated_at": updated}
+        if info:
+            data.update({
+                "server_name": info.server_name,
+                "map_name": info.map_name,
+                "player_count": info.player_count,
+                "max_players": info.max_players,
+                "ping": info.ping,
+                "mode": describe_mode(info.game_mode, info.difficulty),
+            })
+            if with_players:
+                # 在线时长是 updated_at 时的值，客户端可加上距 updated_at 的时间得到当前时长
+                data["players"] = [{"name": p.name, "duration": int(p.duration)} for p in players or ()]
+        return data
+
+    def _groups(self, request: web.Request) -> List[Dict[str, Any]]:
+        """按 ?group= 参数筛选群配置"""
+        group_id = request.query.get("group")
+        groups = self.cfg.get_group_configs()
+        if group_id:
+            groups = [g for g in groups if str(g.get("group_id")) == group_id]
+        return groups
+
+    async def _handle_servers(self, request: web.Request) -> web.StreamResponse:
+        def build():
+            return {
+                "groups": [
+                    {
+                        "group_id": g.get("group_id"),
+                        "servers": [self._server_json(conf, False) for conf in g.get("servers", [])],
+                    }
+                    for g in self._groups(request)
+                ]
+            }
+        return self._respond(request, build)
+
+    async def _handle_server(self, request: web.Request) -> web.StreamResponse:
+        name = request.match_info["name"].replace(" ", "")
+        for g in self._groups(request):
+            for conf in g.get("servers", []):
+                if conf.get("name", "").replace(" ", "") == name:
+                    return self._respond(request, lambda: self._server_json(conf, True))
+        raise web.HTTPNotFound(text=json.dumps({"error": "server not found"}), content_type="application/json")
+
+    def _respond(self, request: web.Request, build) -> web.StreamResponse:
+        """返回 JSON，相同轮询版本内复用序列化结果，ETag 匹配时返回 304"""
+        key = request.path_qs
+        version = self.snapshots.version
+        cached = self._responses.get(key)
+        if not cached or cached[0] != version:
+            if cached is None and len(self._responses) >= self.MAX_CACHED:
+                self._responses.clear()
+            body = json.dumps(build(), ensure_ascii=False).encode("utf-8")
+            cached = (version, body, hashlib.sha1(body).hexdigest())
+            self._responses[key] = cached
+        _, body, etag = cached
+
+        if request.if_none_match and any(e.value == etag for e in request.if_none_match):
+            resp = web.Response(status=304)
+            resp.etag = etag
+            return resp
+
+        resp = web.Response(body=body, content_type="application/json", charset="utf-8")
+        resp.etag = etag
+        # 客户端支持时使用 gzip 压缩
+        resp.enable_compression()
+        return resp
@@ -1,10 +1,79 @@
 import aiohttp
+import asyncio
+import random
 import re
+import time
 import logging
 
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求被直接拒绝"""
+    def __init__(self, retry_after: float):
+        super().__init__(f"circuit open, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    简单的熔断器：连续失败达到阈值后打开，拒绝请求一段时间；
+    冷却结束后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def before_request(self):
+        """请求前检查，熔断中抛出 CircuitOpenError"""
+        if self.state == self.OPEN:
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.reset_timeout:
+                raise CircuitOpenError(self.reset_timeout - elapsed)
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            # 半开状态只允许一个探测请求
+            if self._probing:
+                raise CircuitOpenError(self.reset_timeout)
+            self._probing = True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def release_probe(self):
+        """探测请求未完成 (例如被取消) 时释放名额，允许下一个请求继续探测"""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+class UpstreamError(Exception):
+    """上游 API 返回错误或请求失败，可重试"""
+
+class InvalidResponseError(Exception):
+    """上游 API 返回了无法解析的内容，重试通常无效，但计入熔断失败"""
+
 class WorkshopTools:
-    def __init__(self):
-        self.api_url = "https://steamworkshopdownloader.io/api/details/file"
+    # 单次请求超时、所有重试的总期限以及退避参数 (秒)
+    REQUEST_TIMEOUT = 10.0
+    TOTAL_DEADLINE = 25.0
+    MAX_ATTEMPTS = 4
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 5.0
+
+    def __init__(self, api_url: str = "https://steamworkshopdownloader.io/api/details/file"):
+        self.api_url = api_url
+        self.breaker = CircuitBreaker()
         self.headers = {
             "Content-Type": "application/json",
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
@@ -22,7 +91,10 @@ class WorkshopTools:
 
         # 2. First API call to check details
         # 尝试直接请求 API，看是否返回 children 字段（合集）或 file_url（单品）
-        first_data = await self._fetch_details([main_id])
+        try:
+            first_data = await self._fetch_details([main_id])
+        except CircuitOpenError as e:
+            return None, f"创意工坊解析服务暂时不可用，请 {int(e.retry_after) + 1} 秒后再试"
         
         if not first_data:
             # API 失败
@@ -36,7 +108,10 @@ class WorkshopTools:
             child_ids = [str(child.get("publishedfileid")) for child in item_info["children"] if child.get("publishedfileid")]
             if child_ids:
                 # 再次请求获取子物品详情
-                details = await self._fetch_details(child_ids)
+                try:
+                    details = await self._fetch_details(child_ids)
+                except CircuitOpenError as e:
+                    return None, f"创意工坊解析服务暂时不可用，请 {int(e.retry_after) + 1} 秒后再试"
                 if details:
                     valid_results = [item for item in details if item.get("result") == 1]
                     # 如果主物品本身也有下载链接，也加入列表
@@ -69,9 +144,43 @@ class WorkshopTools:
             except:
                 payload.append(str(i))
 
+        # 带抖动的指数退避重试，所有尝试共享一个总期限
+        deadline = time.monotonic() + self.TOTAL_DEADLINE
+        for attempt in range(self.MAX_ATTEMPTS):
+            self.breaker.before_request()
+            remaining = deadline - time.monotonic()
+            try:
+                data = await self._request(payload, min(self.REQUEST_TIMEOUT, remaining))
+            except asyncio.CancelledError:
+                # 被取消时释放半开状态的探测名额
+                self.breaker.release_probe()
+                raise
+            except UpstreamError as e:
+                self.breaker.record_failure()
+                self.logger.error(f"Downloader API attempt {attempt + 1} failed: {e}")
+            except InvalidResponseError as e:
+                self.breaker.record_failure()
+                self.logger.error(f"Downloader API returned an invalid response: {e}")
+                return None
+            else:
+                self.breaker.record_success()
+                return data
+
+            delay = random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** attempt))
+            if time.monotonic() + delay >= deadline:
+                break
+            await asyncio.sleep(delay)
+        return None
+
+    async def _request(self, payload: list, timeout: float):
+        """
+        发起一次 API 请求，5xx、超时和网络错误抛出 UpstreamError，4xx 返回 None，
+        响应不是 JSON 列表或其他意外错误抛出 InvalidResponseError
+        """
         try:
             async with aiohttp.ClientSession() as session:
-                async with session.post(self.api_url, json=payload, headers=self.headers, timeout=30) as resp:
+                async with session.post(self.api_url, json=payload, headers=self.headers,
+                                        timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
                     if resp.status != 200:
                         self.logger.error(f"API returned status {resp.status}")
                         try:
@@ -79,9 +188,17 @@ class WorkshopTools:
                             self.logger.error(f"API Error body: {err_text}")
                         except:
                             pass
+                        if resp.status >= 500 or resp.status == 429:
+                            raise UpstreamError(f"status {resp.status}")
                         return None
                     # 强制解析 JSON，忽略 Content-Type (API 有时返回 text/plain)
-                    return await resp.json(content_type=None)
+                    data = await resp.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise UpstreamError(repr(e)) from e
+        except UpstreamError:
+            raise
         except Exception as e:
-            self.logger.error(f"Error calling downloader API: {repr(e)}")
-            return None
+            raise InvalidResponseError(repr(e)) from e
+        if not isinstance(data, list):
+            raise InvalidResponseError(f"expected a JSON list, got {type(data).__name__}")
+        return data